@@ -1,158 +1,379 @@
-import random
-from collections import deque
+import time
+
+from endgame import EndgameSolver
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchCancelled(SearchTimeout):
+    pass
 
 
 class AI:
-    def __init__(self, position, color, walls, grid_size):
+    def __init__(
+        self,
+        position,
+        color,
+        walls,
+        grid_size,
+        table_size=1 << 18,
+        time_limit=None,
+        node_limit=None,
+    ):
         self.position = position
         self.color = color
         self.walls = walls
         self.grid_size = grid_size
-        self.search_depth = 2
+        self.search_depth = 3
+        self.max_depth = 32
+        self.consider_all_walls = False
+        self.wall_width = 3
+        self.defense_width = 2
+        self.batch_threshold = 32
+        self.probe_depth = 3
+        self.opening_book = None
+        self.endgame_solver = EndgameSolver()
+        self.stats = None
+        self.move_source = None
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.transposition_table = TranspositionTable(table_size)
+        self.killers = {}
+        self.history = {}
+
+        self.nodes = 0
+        self.deadline = None
+        self.budget_active = False
+        self.completed_depth = 0
+        self.cancelled = False
 
     def make_move(self, game, player):
-        best_move = self.minimax(
-            game, player, self.search_depth, float("-inf"), float("inf"), True
-        )
-
-        if best_move[0] == "move":
-            self.position = list(best_move[1])
-            return "move"
+        best_move = self.choose_move(game, player)
+
+        if best_move[0] is not None:
+            game.apply_move(game.opponent(player), best_move[0], best_move[1])
+        return best_move[0]
+
+    def choose_move(self, game, player):
+        if self.stats is None:
+            return self.select_move(game, player)
+
+        self.stats.begin_turn()
+        searches = game.board.searches
+        game.stats = self.stats
+        try:
+            best_move = self.select_move(game, player)
+        finally:
+            game.stats = None
+
+        self.stats.count("nodes", self.nodes)
+        self.stats.count("bfs", game.board.searches - searches)
+        if self.time_limit is None and self.node_limit is None:
+            depth = self.search_depth
         else:
-            wall_type, x, y = best_move[1]
-            if wall_type == "horizontal":
-                game.horizontal_walls.add((x, y))
-                game.wall_owners[(x, y)] = "ai"
-            else:
-                game.vertical_walls.add((x, y))
-                game.wall_owners[(x, y)] = "ai"
-            self.walls -= 1
-            return "wall"
+            depth = self.completed_depth
+        self.stats.end_turn(
+            game.side(game.opponent(player)), best_move, self.move_source, depth
+        )
+        return best_move
+
+    def select_move(self, game, player):
+        self.nodes = 0
+        if self.opening_book is not None:
+            entry = self.opening_book.probe(game, game.opponent(player))
+            if entry is not None:
+                self.move_source = "book"
+                return entry
+
+        if self.endgame_solver is not None and self.endgame_solver.applies(game):
+            self.move_source = "endgame"
+            return self.endgame_solver.choose_move(game, game.opponent(player))
+
+        self.move_source = "search"
+        return self.search(game, player)
+
+    def search(self, game, player):
+        self.transposition_table.new_search()
+        self.killers = {}
+        for move, score in self.history.items():
+            self.history[move] = score // 2
+        self.nodes = 0
+
+        if self.time_limit is None and self.node_limit is None:
+            return self.minimax(
+                game, player, self.search_depth, float("-inf"), float("inf"), True
+            )
+        return self.iterative_deepening(game, player)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def iterative_deepening(self, game, player):
+        self.deadline = (
+            None if self.time_limit is None else time.perf_counter() + self.time_limit
+        )
+        self.budget_active = False
+        self.completed_depth = 0
+
+        best_move = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                best_move = self.minimax(
+                    game, player, depth, float("-inf"), float("inf"), True
+                )
+            except SearchCancelled:
+                raise
+            except SearchTimeout:
+                break
+
+            self.completed_depth = depth
+            self.budget_active = True
+            if self.out_of_budget():
+                break
+
+        self.budget_active = False
+        return best_move
+
+    def out_of_budget(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
 
     def minimax(self, game, player, depth, alpha, beta, is_maximizing):
+        self.nodes += 1
+        if self.cancelled:
+            raise SearchCancelled()
+        if self.budget_active and self.out_of_budget():
+            raise SearchTimeout()
+
         if depth == 0:
             return ("none", None, self.evaluate_state(game, player))
 
+        key = game.hash ^ game.zobrist.turn if is_maximizing else game.hash
+        entry = self.transposition_table.probe(key)
+        hash_move = None
+        if entry is not None:
+            _, entry_depth, flag, score, action, move, _ = entry
+            if entry_depth >= depth:
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if flag == EXACT or beta <= alpha:
+                    if self.stats is not None:
+                        self.stats.count("tt_hits")
+                    return (action, move, score)
+            hash_move = (action, move)
+
+        original_alpha, original_beta = alpha, beta
+        me = game.opponent(player)
+
         if is_maximizing:
             best_score = float("-inf")
             best_move = None
             best_action = None
 
-            for move in game.get_valid_moves(self.position):
-                original_position = self.position.copy()
-                self.position = [move[0], move[1]]
-
-                _, _, score = self.minimax(game, player, depth - 1, alpha, beta, False)
-
-                self.position = original_position
+            moves = self.order_moves(
+                game, self.get_moves(game, me, player), hash_move, depth, me
+            )
+            leaf_scores = (
+                self.wall_leaf_scores(game, player, me, moves) if depth == 1 else {}
+            )
+
+            for action, move in moves:
+                if action == "wall" and move in leaf_scores:
+                    self.nodes += 1
+                    score = leaf_scores[move]
+                else:
+                    undo = game.apply_move(me, action, move)
+                    try:
+                        _, _, score = self.minimax(
+                            game, player, depth - 1, alpha, beta, False
+                        )
+                    finally:
+                        game.undo_move(me, action, move, undo)
 
                 if score > best_score:
                     best_score = score
                     best_move = move
-                    best_action = "move"
+                    best_action = action
 
                 alpha = max(alpha, best_score)
                 if beta <= alpha:
+                    self.record_cutoff(action, move, depth)
                     break
 
-            if self.walls > 0:
-                wall_options = self.get_wall_options(game, player)
-                for wall_option in wall_options:
-                    wall_type, x, y = wall_option
-
-                    if game.is_valid_wall(wall_type, x, y):
-                        if wall_type == "horizontal":
-                            game.horizontal_walls.add((x, y))
-                        else:
-                            game.vertical_walls.add((x, y))
-
-                        self.walls -= 1
-
-                        _, _, score = self.minimax(
-                            game, player, depth - 1, alpha, beta, False
-                        )
-
-                        if wall_type == "horizontal":
-                            game.horizontal_walls.remove((x, y))
-                        else:
-                            game.vertical_walls.remove((x, y))
-
-                        self.walls += 1
-
-                        if score > best_score:
-                            best_score = score
-                            best_move = wall_option
-                            best_action = "wall"
-
-                        alpha = max(alpha, best_score)
-                        if beta <= alpha:
-                            break
-
-            return (best_action, best_move, best_score)
-
         else:
             best_score = float("inf")
             best_move = None
             best_action = None
 
-            for move in game.get_valid_moves(player.position):
-                original_position = player.position.copy()
-                player.position = [move[0], move[1]]
-
-                _, _, score = self.minimax(game, player, depth - 1, alpha, beta, True)
-
-                player.position = original_position
+            moves = self.order_moves(
+                game, self.get_moves(game, player, me), hash_move, depth, player
+            )
+            leaf_scores = (
+                self.wall_leaf_scores(game, player, player, moves) if depth == 1 else {}
+            )
+
+            for action, move in moves:
+                if action == "wall" and move in leaf_scores:
+                    self.nodes += 1
+                    score = leaf_scores[move]
+                else:
+                    undo = game.apply_move(player, action, move)
+                    try:
+                        _, _, score = self.minimax(
+                            game, player, depth - 1, alpha, beta, True
+                        )
+                    finally:
+                        game.undo_move(player, action, move, undo)
 
                 if score < best_score:
                     best_score = score
                     best_move = move
-                    best_action = "move"
+                    best_action = action
 
                 beta = min(beta, best_score)
                 if beta <= alpha:
+                    self.record_cutoff(action, move, depth)
                     break
 
-            if player.walls > 0:
-                wall_options = self.get_wall_options(game, self)
-                for wall_option in wall_options:
-                    wall_type, x, y = wall_option
-
-                    if game.is_valid_wall(wall_type, x, y):
-                        if wall_type == "horizontal":
-                            game.horizontal_walls.add((x, y))
-                        else:
-                            game.vertical_walls.add((x, y))
-
-                        player.walls -= 1
-
-                        _, _, score = self.minimax(
-                            game, player, depth - 1, alpha, beta, True
-                        )
-
-                        if wall_type == "horizontal":
-                            game.horizontal_walls.remove((x, y))
-                        else:
-                            game.vertical_walls.remove((x, y))
-
-                        player.walls += 1
-
-                        if score < best_score:
-                            best_score = score
-                            best_move = wall_option
-                            best_action = "wall"
-
-                        beta = min(beta, best_score)
-                        if beta <= alpha:
-                            break
+        if best_action is not None:
+            if best_score <= original_alpha:
+                flag = UPPER
+            elif best_score >= original_beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.transposition_table.store(
+                key, depth, flag, best_score, best_action, best_move
+            )
+
+        return (best_action, best_move, best_score)
+
+    def order_moves(self, game, moves, hash_move, depth, pawn):
+        moves = list(moves)
+        killers = self.killers.get(depth, ())
+        opponent = game.opponent(pawn)
+        distances = game.distance_maps[game.goal_row(pawn)]
+        opponent_distances = game.distance_maps[game.goal_row(opponent)]
+        distance = game.distance_to_goal(pawn)
+        opponent_distance = game.distance_to_goal(opponent)
+
+        lengthened = {}
+        if depth >= self.probe_depth and opponent_distance is not None:
+            probes = [
+                move
+                for action, move in moves
+                if action == "wall" and opponent_distances.wall_affects(*move)
+            ]
+            for move, (value,) in zip(
+                probes, self.wall_distances(game, probes, [opponent])
+            ):
+                lengthened[move] = value
+
+        def priority(candidate):
+            action, move = candidate
+            if candidate == hash_move:
+                return (3, 0, 0)
+            if candidate in killers:
+                return (2, 0, 0)
+
+            if action == "move":
+                target = distances.get(*move)
+                gain = 0 if target is None else distance - target
+            elif lengthened.get(move) is not None:
+                gain = lengthened[move] - opponent_distance
+            else:
+                gain = 0
+            return (1, gain, self.history.get(candidate, 0))
+
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def wall_distances(self, game, walls, pawns):
+        if len(walls) >= self.batch_threshold:
+            return game.wall_distances(walls, pawns)
+        return [
+            tuple(game.distance_with_wall(pawn, *wall) for pawn in pawns)
+            for wall in walls
+        ]
+
+    def wall_leaf_scores(self, game, player, pawn, moves):
+        walls = [move for action, move in moves if action == "wall"]
+        if len(walls) < self.batch_threshold:
+            return {}
+
+        if self.stats is not None:
+            started = time.perf_counter()
+
+        me = game.opponent(player)
+        me_walls = me.walls - (pawn is me)
+        player_walls = player.walls - (pawn is player)
+
+        scores = {}
+        for wall, (ai_path_length, player_path_length) in zip(
+            walls, game.wall_distances(walls, [me, player])
+        ):
+            scores[wall] = self.score_position(
+                ai_path_length, player_path_length, me_walls, player_walls
+            )
+
+        if self.stats is not None:
+            self.stats.count("evaluations", len(scores))
+            self.stats.eval_time += time.perf_counter() - started
+        return scores
+
+    def record_cutoff(self, action, move, depth):
+        if self.stats is not None:
+            self.stats.count("cutoffs")
+        candidate = (action, move)
+        killers = self.killers.setdefault(depth, [])
+        if candidate not in killers:
+            killers.insert(0, candidate)
+            del killers[2:]
+        self.history[candidate] = self.history.get(candidate, 0) + depth * depth
+
+    def get_moves(self, game, pawn, opponent):
+        for move in game.get_valid_moves(pawn.position):
+            yield "move", move
+
+        if pawn.walls > 0:
+            if self.consider_all_walls:
+                wall_options = game.get_legal_walls()
+            else:
+                wall_options = [
+                    wall_option
+                    for wall_option in self.get_wall_options(game, opponent)
+                    if game.is_valid_wall(*wall_option)
+                ]
 
-            return (best_action, best_move, best_score)
+            for wall_option in wall_options:
+                yield "wall", wall_option
 
     def evaluate_state(self, game, player):
-        ai_path_length = self.calculate_shortest_path(
-            self.position, game.GRID_SIZE - 1, game
+        if self.stats is not None:
+            started = time.perf_counter()
+
+        me = game.opponent(player)
+        score = self.score_position(
+            game.distance_to_goal(me),
+            game.distance_to_goal(player),
+            me.walls,
+            player.walls,
         )
-        player_path_length = self.calculate_shortest_path(player.position, 0, game)
 
+        if self.stats is not None:
+            self.stats.count("evaluations")
+            self.stats.eval_time += time.perf_counter() - started
+        return score
+
+    def score_position(
+        self, ai_path_length, player_path_length, ai_walls, player_walls
+    ):
         if ai_path_length is None:
             return -1000
         if player_path_length is None:
@@ -160,90 +381,48 @@ class AI:
 
         score = player_path_length - ai_path_length
 
-        score += 0.1 * self.walls - 0.1 * player.walls
+        score += 0.1 * ai_walls - 0.1 * player_walls
 
         return score
 
     def calculate_shortest_path(self, position, goal_row, game):
-        queue = deque([(tuple(position), 0)])
-        visited = set([tuple(position)])
-
-        while queue:
-            (x, y), distance = queue.popleft()
-
-            if y == goal_row:
-                return distance
-
-            for nx, ny in game.get_valid_moves((x, y)):
-                if (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    queue.append(((nx, ny), distance + 1))
-
-        return None
+        return game.shortest_path_length(position, goal_row)
 
     def get_wall_options(self, game, opponent):
-        wall_options = []
+        pawn = game.opponent(opponent)
+        wall_options = {}
 
-        current_path = self.find_path(
-            opponent.position,
-            0 if opponent == game.player else game.GRID_SIZE - 1,
-            game,
-        )
-
-        if not current_path or len(current_path) < 2:
-            return wall_options
+        for (x, y), (dx, dy) in game.shortest_path_steps(opponent, self.wall_width):
+            for wall_option in self.blocking_walls(x, y, dx, dy):
+                wall_options[wall_option] = True
 
-        for i in range(1, min(4, len(current_path))):
-            prev_x, prev_y = current_path[i - 1]
-            x, y = current_path[i]
+        own_walls = {}
+        for (x, y), (dx, dy) in game.shortest_path_steps(pawn, self.defense_width):
+            for wall_option in self.blocking_walls(x, y, dx, dy):
+                own_walls[wall_option] = True
 
-            dx, dy = x - prev_x, y - prev_y
-
-            if dx == 0:
-                if dy < 0:
-                    wall_options.append(("horizontal", prev_x, prev_y))
-                    if prev_x > 0:
-                        wall_options.append(("horizontal", prev_x - 1, prev_y))
-                else:
-                    wall_options.append(("horizontal", prev_x, prev_y + 1))
-                    if prev_x > 0:
-                        wall_options.append(("horizontal", prev_x - 1, prev_y + 1))
-            else:
-                if dx < 0:
-                    wall_options.append(("vertical", prev_x, prev_y))
-                    if prev_y > 0:
-                        wall_options.append(("vertical", prev_x, prev_y - 1))
-                else:
-                    wall_options.append(("vertical", prev_x + 1, prev_y))
-                    if prev_y > 0:
-                        wall_options.append(("vertical", prev_x + 1, prev_y - 1))
-
-        for _ in range(5):
-            wall_type = random.choice(["horizontal", "vertical"])
+        for wall_type, x, y in own_walls:
             if wall_type == "horizontal":
-                x = random.randint(0, game.GRID_SIZE - 2)
-                y = random.randint(1, game.GRID_SIZE - 1)
+                wall_option = ("vertical", x + 1, y - 1)
             else:
-                x = random.randint(1, game.GRID_SIZE - 1)
-                y = random.randint(0, game.GRID_SIZE - 2)
-            wall_options.append((wall_type, x, y))
-
-        return wall_options
+                wall_option = ("horizontal", x - 1, y + 1)
+            if wall_option not in own_walls:
+                wall_options[wall_option] = True
+
+        return [
+            wall_option
+            for wall_option in wall_options
+            if game.board.wall_fits(*wall_option)
+        ]
+
+    def blocking_walls(self, x, y, dx, dy):
+        if dy == -1:
+            return [("horizontal", x, y), ("horizontal", x - 1, y)]
+        if dy == 1:
+            return [("horizontal", x, y + 1), ("horizontal", x - 1, y + 1)]
+        if dx == -1:
+            return [("vertical", x, y), ("vertical", x, y - 1)]
+        return [("vertical", x + 1, y), ("vertical", x + 1, y - 1)]
 
     def find_path(self, position, goal_row, game):
-        queue = deque([(tuple(position), [tuple(position)])])
-        visited = set([tuple(position)])
-
-        while queue:
-            (x, y), path = queue.popleft()
-
-            if y == goal_row:
-                return path
-
-            for nx, ny in game.get_valid_moves((x, y)):
-                if (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    new_path = path + [(nx, ny)]
-                    queue.append(((nx, ny), new_path))
-
-        return None
+        return game.find_path(position, goal_row)
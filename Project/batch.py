@@ -0,0 +1,110 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class BatchEvaluator:
+    def __init__(self, board):
+        self.board = board
+        self.vectorised = np is not None
+        if not self.vectorised:
+            return
+
+        cells = board.size * board.size
+        slots = board.slot_size * board.slot_size
+        self.cells = cells
+        self.row_masks = [self.unpack(mask) for mask in board.row_masks]
+
+        self.blocked = {}
+        for wall_type, edges in (
+            ("horizontal", board.horizontal_edges),
+            ("vertical", board.vertical_edges),
+        ):
+            first = np.zeros((slots + 1, cells), dtype=bool)
+            second = np.zeros((slots + 1, cells), dtype=bool)
+            for index, (a, b) in enumerate(edges):
+                first[index] = self.unpack(a)
+                second[index] = self.unpack(b)
+            self.blocked[wall_type] = (first, second)
+
+    def unpack(self, mask):
+        data = mask.to_bytes((self.cells + 7) // 8, "little")
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")
+        return bits[: self.cells].astype(bool)
+
+    def wall_distances(self, walls, targets):
+        if not walls:
+            return []
+        if not self.vectorised:
+            return self.wall_distances_fallback(walls, targets)
+
+        board = self.board
+        slots = board.slot_size * board.slot_size
+        horizontal = np.full(len(walls), slots)
+        vertical = np.full(len(walls), slots)
+        for row, (wall_type, x, y) in enumerate(walls):
+            index = board.slot_index(wall_type, x, y)
+            if wall_type == "horizontal":
+                horizontal[row] = index
+            else:
+                vertical[row] = index
+
+        below, above = self.blocked["horizontal"]
+        right, left = self.blocked["vertical"]
+        up = self.unpack(board.up) & ~below[horizontal]
+        down = self.unpack(board.down) & ~above[horizontal]
+        left_open = self.unpack(board.left) & ~right[vertical]
+        right_open = self.unpack(board.right) & ~left[vertical]
+
+        count = len(walls)
+        reached = np.concatenate(
+            [
+                np.broadcast_to(self.row_masks[goal_row], up.shape)
+                for _, goal_row in targets
+            ]
+        )
+        cells = np.repeat([y * board.size + x for (x, y), _ in targets], count)
+        distances = self.wavefront(
+            np.tile(up, (len(targets), 1)),
+            np.tile(down, (len(targets), 1)),
+            np.tile(left_open, (len(targets), 1)),
+            np.tile(right_open, (len(targets), 1)),
+            reached,
+            cells,
+        )
+        return list(
+            zip(*(distances[i : i + count] for i in range(0, len(distances), count)))
+        )
+
+    def wavefront(self, up, down, left, right, reached, cells):
+        size = self.board.size
+        rows = np.arange(len(cells))
+        distances = np.where(reached[rows, cells], 0, -1)
+        steps = 0
+
+        while (distances < 0).any():
+            expanded = reached.copy()
+            expanded[:, size:] |= up[:, size:] & reached[:, :-size]
+            expanded[:, :-size] |= down[:, :-size] & reached[:, size:]
+            expanded[:, 1:] |= left[:, 1:] & reached[:, :-1]
+            expanded[:, :-1] |= right[:, :-1] & reached[:, 1:]
+            if (expanded == reached).all():
+                break
+
+            steps += 1
+            distances[(distances < 0) & expanded[rows, cells]] = steps
+            reached = expanded
+
+        return [None if distance < 0 else int(distance) for distance in distances]
+
+    def wall_distances_fallback(self, walls, targets):
+        board = self.board
+        results = []
+        for wall in walls:
+            board.add_wall(*wall)
+            results.append(
+                tuple(board.distance(x, y, goal_row) for (x, y), goal_row in targets)
+            )
+            board.remove_wall(*wall)
+        return results
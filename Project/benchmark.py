@@ -0,0 +1,230 @@
+import argparse
+import json
+import sys
+import time
+
+from ai import AI
+from player import Player
+from rules import GameState
+
+POSITIONS = {
+    "opening": {
+        "player": ([4, 8], 10),
+        "ai": ([4, 0], 10),
+        "walls": [],
+    },
+    "midgame": {
+        "player": ([4, 5], 5),
+        "ai": ([3, 3], 5),
+        "walls": [
+            ("vertical", 3, 2),
+            ("vertical", 6, 7),
+            ("horizontal", 4, 3),
+            ("horizontal", 6, 7),
+            ("vertical", 8, 3),
+            ("horizontal", 6, 1),
+            ("horizontal", 4, 2),
+            ("vertical", 2, 3),
+            ("horizontal", 6, 3),
+            ("vertical", 1, 0),
+        ],
+    },
+    "endgame": {
+        "player": ([3, 3], 0),
+        "ai": ([5, 5], 1),
+        "walls": [
+            ("vertical", 4, 6),
+            ("vertical", 1, 6),
+            ("vertical", 2, 1),
+            ("vertical", 8, 6),
+            ("vertical", 5, 5),
+            ("vertical", 1, 0),
+            ("horizontal", 7, 8),
+            ("vertical", 6, 1),
+            ("vertical", 5, 3),
+            ("horizontal", 3, 4),
+            ("horizontal", 5, 4),
+            ("vertical", 1, 3),
+            ("vertical", 4, 2),
+            ("vertical", 5, 7),
+            ("vertical", 3, 7),
+            ("horizontal", 1, 5),
+            ("horizontal", 7, 2),
+            ("vertical", 4, 4),
+            ("horizontal", 3, 8),
+        ],
+    },
+}
+
+LOWER_IS_BETTER = {"time_to_move_ms"}
+
+
+def build_position(name):
+    spec = POSITIONS[name]
+    position, walls = spec["ai"]
+    state = GameState(
+        Player(list(spec["player"][0]), None, spec["player"][1]),
+        AI(list(position), None, walls, 9, table_size=1 << 16),
+    )
+    for index, wall in enumerate(spec["walls"]):
+        state.add_wall(*wall, "player" if index % 2 == 0 else "ai")
+    return state
+
+
+def measure(function, repeat, min_time):
+    best = float("inf")
+    operations = 0
+    for _ in range(repeat):
+        count = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            count += function()
+            elapsed = time.perf_counter() - started
+        if elapsed / count < best:
+            best = elapsed / count
+            operations = count
+    return 1.0 / best if operations else 0.0
+
+
+def bench_moves(state):
+    cells = [(x, y) for x in range(state.GRID_SIZE) for y in range(state.GRID_SIZE)]
+
+    def run():
+        for cell in cells:
+            state.get_valid_moves(cell)
+        return len(cells)
+
+    return run
+
+
+def bench_wall_checks(state):
+    walls = [
+        (wall_type, x, y)
+        for wall_type in ("horizontal", "vertical")
+        for x in range(state.GRID_SIZE)
+        for y in range(state.GRID_SIZE)
+    ]
+
+    def run():
+        for wall in walls:
+            state.is_valid_wall(*wall)
+        return len(walls)
+
+    return run
+
+
+def bench_legal_walls(state):
+    def run():
+        state.clear_wall_cache()
+        state.legal_wall_masks()
+        return 1
+
+    return run
+
+
+def bench_shortest_path(state):
+    cells = [(x, y) for x in range(state.GRID_SIZE) for y in range(state.GRID_SIZE)]
+
+    def run():
+        for cell in cells:
+            state.board.distance(cell[0], cell[1], 0)
+        return len(cells)
+
+    return run
+
+
+def bench_search(name, depth, repeat):
+    nodes_per_second = 0.0
+    best_time = float("inf")
+
+    for _ in range(repeat):
+        state = build_position(name)
+        state.ai.search_depth = depth
+
+        started = time.perf_counter()
+        state.ai.choose_move(state, state.player)
+        elapsed = time.perf_counter() - started
+
+        best_time = min(best_time, elapsed)
+        nodes_per_second = max(nodes_per_second, state.ai.nodes / elapsed)
+
+    return nodes_per_second, best_time * 1000
+
+
+def run_benchmarks(depth, repeat, min_time):
+    results = {}
+    for name in POSITIONS:
+        state = build_position(name)
+        metrics = {
+            "valid_moves_per_sec": measure(bench_moves(state), repeat, min_time),
+            "wall_checks_per_sec": measure(bench_wall_checks(state), repeat, min_time),
+            "legal_wall_sets_per_sec": measure(
+                bench_legal_walls(state), repeat, min_time
+            ),
+            "shortest_paths_per_sec": measure(
+                bench_shortest_path(state), repeat, min_time
+            ),
+        }
+        nodes, time_to_move = bench_search(name, depth, repeat)
+        metrics["search_nodes_per_sec"] = nodes
+        metrics["time_to_move_ms"] = time_to_move
+        results[name] = metrics
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            previous = baseline.get(name, {}).get(metric)
+            if not previous:
+                continue
+
+            if metric in LOWER_IS_BETTER:
+                change = (value - previous) / previous
+            else:
+                change = (previous - value) / previous
+
+            if change > tolerance:
+                regressions.append((name, metric, previous, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quoridor engine benchmarks")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.depth, args.repeat, args.min_time)
+
+    for name, metrics in results.items():
+        print(name)
+        for metric, value in metrics.items():
+            print(f"  {metric:<26} {value:>14,.1f}")
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, previous, value, change in regressions:
+            print(
+                f"REGRESSION {name}.{metric}: {previous:,.1f} -> {value:,.1f} "
+                f"({change:.1%} worse)"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
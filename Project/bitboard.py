@@ -0,0 +1,448 @@
+UP, RIGHT, DOWN, LEFT = range(4)
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+STATE = (
+    "size",
+    "horizontal_slots",
+    "vertical_slots",
+    "open_edges",
+    "up",
+    "down",
+    "left",
+    "right",
+    "searches",
+)
+
+board_tables = {}
+
+
+class BoardTables:
+    def __init__(self, grid_size):
+        self.size = grid_size
+        self.slot_size = grid_size - 1
+
+        cells = grid_size * grid_size
+        self.cells = [(index % grid_size, index // grid_size) for index in range(cells)]
+        self.neighbours = []
+        self.border_edges = []
+        self.neighbour_table = []
+        for x, y in self.cells:
+            neighbours = [
+                (
+                    self.cell_index(x + dx, y + dy)
+                    if 0 <= x + dx < grid_size and 0 <= y + dy < grid_size
+                    else None
+                )
+                for dx, dy in DIRECTIONS
+            ]
+            border = sum(
+                1 << direction
+                for direction in range(4)
+                if neighbours[direction] is not None
+            )
+            self.neighbours.append(neighbours)
+            self.border_edges.append(border)
+            self.neighbour_table.append(
+                [
+                    tuple(
+                        (
+                            direction,
+                            neighbours[direction],
+                            self.cells[neighbours[direction]],
+                        )
+                        for direction in range(4)
+                        if (edges & border) >> direction & 1
+                    )
+                    for edges in range(16)
+                ]
+            )
+
+        self.all_cells = (1 << cells) - 1
+        self.row_masks = [
+            ((1 << grid_size) - 1) << (row * grid_size) for row in range(grid_size)
+        ]
+
+        first_column = 0
+        for row in range(grid_size):
+            first_column |= 1 << (row * grid_size)
+        last_column = first_column << (grid_size - 1)
+        self.open_masks = (
+            self.all_cells & ~self.row_masks[0],
+            self.all_cells & ~self.row_masks[-1],
+            self.all_cells & ~first_column,
+            self.all_cells & ~last_column,
+        )
+
+        slots = self.slot_size * self.slot_size
+        self.all_slots = (1 << slots) - 1
+        first_slot_column = 0
+        for row in range(self.slot_size):
+            first_slot_column |= 1 << (row * self.slot_size)
+        last_slot_column = first_slot_column << (self.slot_size - 1)
+        self.slots_after_first_column = self.all_slots & ~first_slot_column
+        self.slots_before_last_column = self.all_slots & ~last_slot_column
+
+        self.horizontal_conflicts = []
+        self.vertical_conflicts = []
+        self.horizontal_edges = []
+        self.vertical_edges = []
+        self.horizontal_cuts = []
+        self.vertical_cuts = []
+        self.up_walls = [0] * cells
+        self.left_walls = [0] * cells
+
+        for index in range(self.slot_size * self.slot_size):
+            cx = index % self.slot_size + 1
+            cy = index // self.slot_size + 1
+
+            conflicts = 1 << index
+            if cx > 1:
+                conflicts |= 1 << (index - 1)
+            if cx < self.slot_size:
+                conflicts |= 1 << (index + 1)
+            self.horizontal_conflicts.append(conflicts)
+
+            conflicts = 1 << index
+            if cy > 1:
+                conflicts |= 1 << (index - self.slot_size)
+            if cy < self.slot_size:
+                conflicts |= 1 << (index + self.slot_size)
+            self.vertical_conflicts.append(conflicts)
+
+            below = self.cell_bit(cx - 1, cy) | self.cell_bit(cx, cy)
+            above = self.cell_bit(cx - 1, cy - 1) | self.cell_bit(cx, cy - 1)
+            self.horizontal_edges.append((below, above))
+            self.horizontal_cuts.append(
+                (
+                    (self.cell_index(cx - 1, cy), self.cell_index(cx - 1, cy - 1)),
+                    (self.cell_index(cx, cy), self.cell_index(cx, cy - 1)),
+                )
+            )
+            self.up_walls[self.cell_index(cx - 1, cy)] |= 1 << index
+            self.up_walls[self.cell_index(cx, cy)] |= 1 << index
+
+            right = self.cell_bit(cx, cy - 1) | self.cell_bit(cx, cy)
+            left = self.cell_bit(cx - 1, cy - 1) | self.cell_bit(cx - 1, cy)
+            self.vertical_edges.append((right, left))
+            self.vertical_cuts.append(
+                (
+                    (self.cell_index(cx, cy - 1), self.cell_index(cx - 1, cy - 1)),
+                    (self.cell_index(cx, cy), self.cell_index(cx - 1, cy)),
+                )
+            )
+            self.left_walls[self.cell_index(cx, cy - 1)] |= 1 << index
+            self.left_walls[self.cell_index(cx, cy)] |= 1 << index
+
+    def cell_index(self, x, y):
+        return y * self.size + x
+
+    def cell_bit(self, x, y):
+        return 1 << (y * self.size + x)
+
+
+def tables_for(grid_size):
+    tables = board_tables.get(grid_size)
+    if tables is None:
+        tables = board_tables[grid_size] = BoardTables(grid_size)
+    return tables
+
+
+class BitBoard:
+    def __init__(self, grid_size):
+        self.attach_tables(tables_for(grid_size))
+        self.searches = 0
+        self.clear()
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in STATE}
+
+    def __setstate__(self, state):
+        self.attach_tables(tables_for(state["size"]))
+        self.searches = state["searches"]
+        self.horizontal_slots = state["horizontal_slots"]
+        self.vertical_slots = state["vertical_slots"]
+        self.open_edges = state["open_edges"]
+        self.up = state["up"]
+        self.down = state["down"]
+        self.left = state["left"]
+        self.right = state["right"]
+
+    def attach_tables(self, tables):
+        self.size = tables.size
+        self.slot_size = tables.slot_size
+        self.cells = tables.cells
+        self.neighbours = tables.neighbours
+        self.border_edges = tables.border_edges
+        self.neighbour_table = tables.neighbour_table
+        self.all_cells = tables.all_cells
+        self.row_masks = tables.row_masks
+        self.open_masks = tables.open_masks
+        self.all_slots = tables.all_slots
+        self.slots_after_first_column = tables.slots_after_first_column
+        self.slots_before_last_column = tables.slots_before_last_column
+        self.horizontal_conflicts = tables.horizontal_conflicts
+        self.vertical_conflicts = tables.vertical_conflicts
+        self.horizontal_edges = tables.horizontal_edges
+        self.vertical_edges = tables.vertical_edges
+        self.horizontal_cuts = tables.horizontal_cuts
+        self.vertical_cuts = tables.vertical_cuts
+        self.up_walls = tables.up_walls
+        self.left_walls = tables.left_walls
+
+    def clear(self):
+        self.horizontal_slots = 0
+        self.vertical_slots = 0
+        self.open_edges = list(self.border_edges)
+        self.up, self.down, self.left, self.right = self.open_masks
+
+    def cell_index(self, x, y):
+        return y * self.size + x
+
+    def cell_bit(self, x, y):
+        return 1 << (y * self.size + x)
+
+    def slot_index(self, wall_type, x, y):
+        if wall_type == "horizontal":
+            return (y - 1) * self.slot_size + x
+        return y * self.slot_size + x - 1
+
+    def slot_wall(self, wall_type, index):
+        cx = index % self.slot_size + 1
+        cy = index // self.slot_size + 1
+        if wall_type == "horizontal":
+            return (wall_type, cx - 1, cy)
+        return (wall_type, cx, cy - 1)
+
+    def wall_cuts(self, wall_type, x, y):
+        index = self.slot_index(wall_type, x, y)
+        if wall_type == "horizontal":
+            return self.horizontal_cuts[index]
+        return self.vertical_cuts[index]
+
+    def in_bounds(self, wall_type, x, y):
+        if wall_type == "horizontal":
+            return 0 <= x < self.size - 1 and 0 < y < self.size
+        return 0 < x < self.size and 0 <= y < self.size - 1
+
+    def wall_fits(self, wall_type, x, y):
+        if not self.in_bounds(wall_type, x, y):
+            return False
+
+        index = self.slot_index(wall_type, x, y)
+        if wall_type == "horizontal":
+            if self.horizontal_slots & self.horizontal_conflicts[index]:
+                return False
+            return not (self.vertical_slots >> index) & 1
+
+        if self.vertical_slots & self.vertical_conflicts[index]:
+            return False
+        return not (self.horizontal_slots >> index) & 1
+
+    def fitting_walls(self):
+        horizontal = self.horizontal_slots
+        vertical = self.vertical_slots
+
+        blocked_horizontal = (
+            horizontal
+            | vertical
+            | ((horizontal << 1) & self.slots_after_first_column)
+            | ((horizontal >> 1) & self.slots_before_last_column)
+        )
+        blocked_vertical = (
+            vertical
+            | horizontal
+            | (vertical << self.slot_size)
+            | (vertical >> self.slot_size)
+        )
+
+        return (
+            self.all_slots & ~blocked_horizontal,
+            self.all_slots & ~blocked_vertical,
+        )
+
+    def path_walls(self, path):
+        horizontal = 0
+        vertical = 0
+
+        for (x, y), (nx, ny) in zip(path, path[1:]):
+            if x == nx:
+                horizontal |= self.up_walls[max(y, ny) * self.size + x]
+            else:
+                vertical |= self.left_walls[y * self.size + max(x, nx)]
+
+        return horizontal, vertical
+
+    def routes(self, targets):
+        routes = []
+        for x, y, goal_row in targets:
+            path = self.find_path(x, y, goal_row)
+            if path is None:
+                return None
+            routes.append((x, y, goal_row) + self.path_walls(path))
+
+        return routes
+
+    def keeps_paths(self, wall_type, x, y, routes):
+        bit = 1 << self.slot_index(wall_type, x, y)
+        side = 3 if wall_type == "horizontal" else 4
+        cut = [route for route in routes if route[side] & bit]
+        if not cut:
+            return True
+
+        self.add_wall(wall_type, x, y)
+        keeps = all(self.has_path(*route[:3]) for route in cut)
+        self.remove_wall(wall_type, x, y)
+        return keeps
+
+    def legal_walls(self, routes):
+        if routes is None:
+            return 0, 0
+
+        legal = []
+        for side, wall_type, candidates in zip(
+            (3, 4), ("horizontal", "vertical"), self.fitting_walls()
+        ):
+            critical = 0
+            for route in routes:
+                critical |= route[side]
+
+            check = candidates & critical
+            while check:
+                bit = check & -check
+                check ^= bit
+
+                _, x, y = self.slot_wall(wall_type, bit.bit_length() - 1)
+                if not self.keeps_paths(wall_type, x, y, routes):
+                    candidates ^= bit
+
+            legal.append(candidates)
+
+        return legal[0], legal[1]
+
+    def add_wall(self, wall_type, x, y):
+        index = self.slot_index(wall_type, x, y)
+        if wall_type == "horizontal":
+            self.horizontal_slots |= 1 << index
+            below, above = self.horizontal_edges[index]
+            self.up &= ~below
+            self.down &= ~above
+            for below, above in self.horizontal_cuts[index]:
+                self.open_edges[below] &= ~(1 << UP)
+                self.open_edges[above] &= ~(1 << DOWN)
+        else:
+            self.vertical_slots |= 1 << index
+            right, left = self.vertical_edges[index]
+            self.left &= ~right
+            self.right &= ~left
+            for right, left in self.vertical_cuts[index]:
+                self.open_edges[right] &= ~(1 << LEFT)
+                self.open_edges[left] &= ~(1 << RIGHT)
+
+    def remove_wall(self, wall_type, x, y):
+        index = self.slot_index(wall_type, x, y)
+        if wall_type == "horizontal":
+            self.horizontal_slots &= ~(1 << index)
+            below, above = self.horizontal_edges[index]
+            self.up |= below
+            self.down |= above
+            for below, above in self.horizontal_cuts[index]:
+                self.open_edges[below] |= 1 << UP
+                self.open_edges[above] |= 1 << DOWN
+        else:
+            self.vertical_slots &= ~(1 << index)
+            right, left = self.vertical_edges[index]
+            self.left |= right
+            self.right |= left
+            for right, left in self.vertical_cuts[index]:
+                self.open_edges[right] |= 1 << LEFT
+                self.open_edges[left] |= 1 << RIGHT
+
+    def can_step(self, x, y, dx, dy):
+        index = y * self.size + x
+        if dy == -1:
+            return (self.up >> index) & 1
+        if dy == 1:
+            return (self.down >> index) & 1
+        if dx == -1:
+            return (self.left >> index) & 1
+        return (self.right >> index) & 1
+
+    def open_neighbours(self, index):
+        return self.neighbour_table[index][self.open_edges[index]]
+
+    def pawn_moves(self, index, other):
+        targets = []
+        for direction, neighbour, _ in self.open_neighbours(index):
+            if neighbour != other:
+                targets.append(neighbour)
+            elif (self.open_edges[neighbour] >> direction) & 1:
+                targets.append(self.neighbours[neighbour][direction])
+
+        return targets
+
+    def expand(self, cells):
+        return (
+            cells
+            | ((cells & self.up) >> self.size)
+            | ((cells & self.down) << self.size)
+            | ((cells & self.left) >> 1)
+            | ((cells & self.right) << 1)
+        )
+
+    def has_path(self, x, y, goal_row):
+        self.searches += 1
+        goal = self.row_masks[goal_row]
+        reached = self.cell_bit(x, y)
+
+        while not reached & goal:
+            expanded = self.expand(reached)
+            if expanded == reached:
+                return False
+            reached = expanded
+
+        return True
+
+    def distance(self, x, y, goal_row):
+        self.searches += 1
+        goal = self.row_masks[goal_row]
+        reached = self.cell_bit(x, y)
+        steps = 0
+
+        while not reached & goal:
+            expanded = self.expand(reached)
+            if expanded == reached:
+                return None
+            reached = expanded
+            steps += 1
+
+        return steps
+
+    def find_path(self, x, y, goal_row):
+        self.searches += 1
+        goal = self.row_masks[goal_row]
+        reached = self.cell_bit(x, y)
+        layers = [reached]
+
+        while not reached & goal:
+            expanded = self.expand(reached)
+            if expanded == reached:
+                return None
+            layers.append(expanded & ~reached)
+            reached = expanded
+
+        target = layers[-1] & goal
+        index = (target & -target).bit_length() - 1
+        path = [(index % self.size, index // self.size)]
+
+        for layer in reversed(layers[:-1]):
+            if (self.up >> index) & 1 and (layer >> (index - self.size)) & 1:
+                index -= self.size
+            elif (self.down >> index) & 1 and (layer >> (index + self.size)) & 1:
+                index += self.size
+            elif (self.left >> index) & 1 and (layer >> (index - 1)) & 1:
+                index -= 1
+            else:
+                index += 1
+            path.append((index % self.size, index // self.size))
+
+        path.reverse()
+        return path
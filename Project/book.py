@@ -0,0 +1,165 @@
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+
+from ai import AI
+from rules import replay
+
+MAGIC = b"QBK1"
+HEADER = struct.Struct("<4sHHQ")
+RECORD = struct.Struct("<QBBBf")
+ACTIONS = ["move", "horizontal", "vertical"]
+
+
+def position_key(game, pawn):
+    if game.side(pawn) == 1:
+        return game.hash ^ game.zobrist.turn
+    return game.hash
+
+
+def encode_move(action, move):
+    if action == "move":
+        return 0, move[0], move[1]
+    wall_type, x, y = move
+    return ACTIONS.index(wall_type), x, y
+
+
+def decode_move(code, x, y):
+    if code == 0:
+        return "move", (x, y)
+    return "wall", (ACTIONS[code], x, y)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.handle = open(path, "rb")
+        self.data = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.grid_size, self.max_walls, self.count = HEADER.unpack_from(
+            self.data, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+
+    def close(self):
+        self.data.close()
+        self.handle.close()
+
+    def lookup(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            record = RECORD.unpack_from(self.data, offset)
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                action, move = decode_move(*record[1:4])
+                return action, move, record[4]
+        return None
+
+    def probe(self, game, pawn):
+        if game.GRID_SIZE != self.grid_size:
+            return None
+
+        entry = self.lookup(position_key(game, pawn))
+        if entry is None:
+            return None
+
+        action, move, score = entry
+        if action == "move":
+            if move not in game.get_valid_moves(pawn.position):
+                return None
+        elif pawn.walls <= 0 or not game.is_valid_wall(*move):
+            return None
+        return entry
+
+
+def write_book(path, entries, grid_size, max_walls):
+    with open(path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, grid_size, max_walls, len(entries)))
+        for key in sorted(entries):
+            action, move, score = entries[key]
+            handle.write(RECORD.pack(key, *encode_move(action, move), score))
+
+
+def replay_line(line, grid_size, walls):
+    for state in replay(line, grid_size, walls):
+        pass
+    return state
+
+
+def opening_lines(plies, grid_size, walls):
+    generator = AI([0, 0], None, 0, grid_size)
+    lines = {}
+    frontier = [[]]
+
+    for _ in range(plies + 1):
+        next_frontier = []
+        for line in frontier:
+            state = replay_line(line, grid_size, walls)
+            mover = state.player if state.player_turn else state.ai
+            key = position_key(state, mover)
+            if key in lines or state.check_win():
+                continue
+            lines[key] = line
+
+            opponent = state.opponent(mover)
+            for action, move in generator.get_moves(state, mover, opponent):
+                next_frontier.append(line + [(action, move)])
+        frontier = next_frontier
+
+    return list(lines.items())
+
+
+def search_line(task):
+    key, line, depth, grid_size, walls = task
+    state = replay_line(line, grid_size, walls)
+    mover = state.player if state.player_turn else state.ai
+
+    engine = AI([0, 0], None, 0, grid_size, table_size=1 << 16)
+    engine.search_depth = depth
+    action, move, score = engine.choose_move(state, state.opponent(mover))
+    return key, action, move, score
+
+
+def build(plies, depth, workers, grid_size=9, walls=10):
+    tasks = [
+        (key, line, depth, grid_size, walls)
+        for key, line in opening_lines(plies, grid_size, walls)
+    ]
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.imap_unordered(search_line, tasks, chunksize=4)
+        return {
+            key: (action, move, score)
+            for key, action, move, score in results
+            if action is not None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a Quoridor opening book")
+    parser.add_argument("--plies", type=int, default=2)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--walls", type=int, default=10)
+    parser.add_argument("--output", default="opening.book")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    entries = build(args.plies, args.depth, args.workers, args.size, args.walls)
+    write_book(args.output, entries, args.size, args.walls)
+    print(
+        f"{len(entries)} positions written to {args.output} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
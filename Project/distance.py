@@ -0,0 +1,120 @@
+UNREACHABLE = float("inf")
+
+
+class DistanceMap:
+    def __init__(self, board, goal_row):
+        self.board = board
+        self.goal_row = goal_row
+        self.rebuild()
+
+    def rebuild(self):
+        size = self.board.size
+        self.distances = [UNREACHABLE] * (size * size)
+        self.layers = []
+        self.cumulative = []
+        self.journal = []
+
+        layer = self.board.row_masks[self.goal_row]
+        reached = layer
+        while layer:
+            self.set_layer(layer, len(self.layers), None)
+            self.layers.append(layer)
+            self.cumulative.append(reached)
+            expanded = self.board.expand(reached)
+            layer = expanded & ~reached
+            reached = expanded
+
+    def set_layer(self, cells, distance, changes):
+        distances = self.distances
+        while cells:
+            bit = cells & -cells
+            index = bit.bit_length() - 1
+            if changes is not None:
+                changes.append((index, distances[index]))
+            distances[index] = distance
+            cells ^= bit
+
+    def get(self, x, y):
+        distance = self.distances[y * self.board.size + x]
+        return None if distance == UNREACHABLE else distance
+
+    def affected_start(self, wall_type, x, y, added):
+        distances = self.distances
+        start = UNREACHABLE
+        endpoints = 0
+
+        for a, b in self.board.wall_cuts(wall_type, x, y):
+            nearest = min(distances[a], distances[b])
+            if nearest == UNREACHABLE:
+                continue
+
+            endpoints |= (1 << a) | (1 << b)
+            gap = abs(distances[a] - distances[b])
+            if (gap == 1) if added else (gap > 1):
+                start = min(start, nearest + 1)
+
+        return start, endpoints
+
+    def wall_affects(self, wall_type, x, y):
+        return self.affected_start(wall_type, x, y, True)[0] != UNREACHABLE
+
+    def wall_added(self, wall_type, x, y):
+        start, endpoints = self.affected_start(wall_type, x, y, True)
+        update = None
+        if start != UNREACHABLE:
+            update = self.update(start, endpoints)
+        self.journal.append(((wall_type, x, y), update))
+
+    def wall_removed(self, wall_type, x, y):
+        if self.journal and self.journal[-1][0] == (wall_type, x, y):
+            _, update = self.journal.pop()
+            if update is not None:
+                self.restore(update)
+            return
+
+        self.journal = []
+        start, endpoints = self.affected_start(wall_type, x, y, False)
+        if start != UNREACHABLE:
+            self.update(start, endpoints)
+
+    def update(self, start, endpoints):
+        old_layers = self.layers[start:]
+        old_cumulative = self.cumulative[start:]
+        del self.layers[start:]
+        del self.cumulative[start:]
+
+        changes = []
+        reached = self.cumulative[-1]
+        old_reached = old_cumulative[-1] if old_cumulative else reached
+
+        while True:
+            expanded = self.board.expand(reached)
+            layer = expanded & ~reached
+            if not layer:
+                break
+
+            offset = len(self.layers) - start
+            old_layer = old_layers[offset] if offset < len(old_layers) else 0
+            self.set_layer(layer & ~old_layer, len(self.layers), changes)
+            self.layers.append(layer)
+            self.cumulative.append(expanded)
+            reached = expanded
+
+            if (
+                offset < len(old_cumulative)
+                and expanded == old_cumulative[offset]
+                and expanded & endpoints == endpoints
+            ):
+                self.layers.extend(old_layers[offset + 1 :])
+                self.cumulative.extend(old_cumulative[offset + 1 :])
+                return start, old_layers, old_cumulative, changes
+
+        self.set_layer(old_reached & ~reached, UNREACHABLE, changes)
+        return start, old_layers, old_cumulative, changes
+
+    def restore(self, update):
+        start, old_layers, old_cumulative, changes = update
+        self.layers[start:] = old_layers
+        self.cumulative[start:] = old_cumulative
+        for index, distance in changes:
+            self.distances[index] = distance
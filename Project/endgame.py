@@ -0,0 +1,124 @@
+from collections import OrderedDict, deque
+
+WIN = 1
+LOSS = -1
+DRAW = 0
+
+
+class EndgameSolver:
+    def __init__(self, max_layouts=8):
+        self.max_layouts = max_layouts
+        self.tables = OrderedDict()
+
+    def applies(self, game):
+        return game.player.walls == 0 and game.ai.walls == 0
+
+    def table(self, board):
+        key = (board.size, board.horizontal_slots, board.vertical_slots)
+        table = self.tables.get(key)
+        if table is not None:
+            self.tables.move_to_end(key)
+            return table
+
+        table = self.solve(board)
+        self.tables[key] = table
+        if len(self.tables) > self.max_layouts:
+            self.tables.popitem(last=False)
+        return table
+
+    def moves(self, board, position, other):
+        return board.pawn_moves(position, other)
+
+    def successors(self, board, state):
+        cells = board.size * board.size
+        turn, rest = divmod(state, cells * cells)
+        player, ai = divmod(rest, cells)
+
+        if turn == 0:
+            targets = self.moves(board, player, ai) or [player]
+            return [(1 * cells + target) * cells + ai for target in targets]
+        targets = self.moves(board, ai, player) or [ai]
+        return [player * cells + target for target in targets]
+
+    def solve(self, board):
+        size = board.size
+        cells = size * size
+        states = 2 * cells * cells
+
+        values = [None] * states
+        plies = [0] * states
+        remaining = [0] * states
+        predecessors = [[] for _ in range(states)]
+        queue = deque()
+
+        for state in range(states):
+            turn, rest = divmod(state, cells * cells)
+            player, ai = divmod(rest, cells)
+            if player == ai:
+                continue
+
+            if player < size or ai >= cells - size:
+                winner = 0 if player < size else 1
+                values[state] = WIN if winner == turn else LOSS
+                queue.append(state)
+                continue
+
+            successors = self.successors(board, state)
+            remaining[state] = len(successors)
+            for successor in successors:
+                predecessors[successor].append(state)
+
+        while queue:
+            state = queue.popleft()
+            for previous in predecessors[state]:
+                if values[previous] is not None:
+                    continue
+
+                if values[state] == LOSS:
+                    values[previous] = WIN
+                    plies[previous] = plies[state] + 1
+                    queue.append(previous)
+                else:
+                    remaining[previous] -= 1
+                    if remaining[previous] == 0:
+                        values[previous] = LOSS
+                        plies[previous] = plies[state] + 1
+                        queue.append(previous)
+
+        return values, plies
+
+    def choose_move(self, game, pawn):
+        board = game.board
+        size = board.size
+        cells = size * size
+        values, plies = self.table(board)
+
+        position = pawn.position[1] * size + pawn.position[0]
+        other = game.opponent(pawn).position
+        other = other[1] * size + other[0]
+        turn = game.side(pawn)
+
+        best = None
+        for target in self.moves(board, position, other):
+            if turn == 0:
+                state = (cells + target) * cells + other
+            else:
+                state = other * cells + target
+
+            value = values[state]
+            if value is None:
+                rank = (0, 0)
+            elif value == LOSS:
+                rank = (1, -plies[state])
+            else:
+                rank = (-1, plies[state])
+
+            if best is None or rank > best[0]:
+                best = (rank, target)
+
+        if best is None:
+            return None, None, 0
+
+        (outcome, length), target = best
+        score = outcome * (1000 - abs(length))
+        return "move", (target % size, target // size), score
@@ -1,18 +1,31 @@
+import argparse
 import pygame
+import logging
 import os
-from collections import deque
+from collections import OrderedDict
 from player import Player
 from ai import AI
+from book import OpeningBook
+from records import GameRecord, RecordWriter
+from rules import GameState, start_positions
+from stats import SearchStats
+from worker import AIWorker
 
 
-class QuoridorGame:
-    def __init__(self):
+class QuoridorGame(GameState):
+    def __init__(
+        self, grid_size=9, walls=10, stats=False, trace_path=None, record_path=None
+    ):
         pygame.init()
 
-        self.CELL_SIZE = 60
-        self.GRID_SIZE = 9
+        self.CELL_SIZE = max(30, 540 // grid_size)
+        self.GRID_SIZE = grid_size
+        self.PAWN_INSET = self.CELL_SIZE // 6
+        self.WALL_ZONE = self.CELL_SIZE // 3
         self.WIDTH = self.HEIGHT = self.CELL_SIZE * self.GRID_SIZE
         self.FPS = 60
+        self.DOTS_INTERVAL = 400
+        self.AI_DONE = pygame.USEREVENT
 
         self.WHITE = (255, 255, 255)
         self.GRAY = (200, 200, 200)
@@ -32,20 +45,37 @@ class QuoridorGame:
         self.clock = pygame.time.Clock()
 
         self.load_fonts()
+        self.text_cache = OrderedDict()
+        self.text_cache_size = 64
+
+        player_start, ai_start = start_positions(self.GRID_SIZE)
+        super().__init__(
+            Player(player_start, self.BLUE, walls),
+            AI(ai_start, self.RED, walls, self.GRID_SIZE),
+            self.GRID_SIZE,
+        )
 
-        self.horizontal_walls = set()
-        self.vertical_walls = set()
-        self.wall_owners = {}
+        book_path = os.path.join(os.path.dirname(__file__), "opening.book")
+        if os.path.exists(book_path):
+            self.ai.opening_book = OpeningBook(book_path)
 
-        self.player = Player([4, 8], self.BLUE, 10)
-        self.ai = AI([4, 0], self.RED, 10, self.GRID_SIZE)
+        self.ai_worker = AIWorker(self.ai, on_done=self.notify_ai_done)
 
-        self.player_turn = True
-        self.game_over = False
-        self.winner = None
         self.show_start_screen = True
         self.show_end_popup = False
 
+        self.record_path = record_path
+        self.record = self.new_record()
+
+        self.trace_path = trace_path
+        self.show_stats = stats
+        if stats or trace_path:
+            self.ai.stats = SearchStats(log=stats)
+
+        self.build_sprites()
+        self.last_scene = None
+        self.needs_full_redraw = True
+
     def load_fonts(self):
         fonts_dir = os.path.join(os.path.dirname(__file__), "fonts")
 
@@ -68,6 +98,20 @@ class QuoridorGame:
         self.title_font = pygame.font.SysFont(self.font_name, 64, bold=True)
         self.button_font = pygame.font.SysFont(self.font_name, 42, bold=True)
         self.ui_font = pygame.font.SysFont(self.font_name, 24)
+        self.stats_font = pygame.font.SysFont(self.font_name, 16)
+
+    def render_text(self, font, text, color):
+        key = (font, text, color)
+        surface = self.text_cache.get(key)
+        if surface is not None:
+            self.text_cache.move_to_end(key)
+            return surface
+
+        surface = font.render(text, True, color)
+        self.text_cache[key] = surface
+        if len(self.text_cache) > self.text_cache_size:
+            self.text_cache.popitem(last=False)
+        return surface
 
     def draw_rounded_rect(
         self, surface, color, rect, radius=15, border=0, border_color=None
@@ -114,160 +158,250 @@ class QuoridorGame:
                 border,
             )
 
-    def draw_grid(self):
-        self.screen.fill(self.BACKGROUND)
+    def build_sprites(self):
+        self.background = pygame.Surface((self.WIDTH, self.HEIGHT + 60))
+        self.background.fill(self.BACKGROUND)
         for x in range(0, self.WIDTH, self.CELL_SIZE):
-            pygame.draw.line(self.screen, self.GRID_COLOR, (x, 0), (x, self.HEIGHT), 2)
+            pygame.draw.line(
+                self.background, self.GRID_COLOR, (x, 0), (x, self.HEIGHT), 2
+            )
         for y in range(0, self.HEIGHT, self.CELL_SIZE):
-            pygame.draw.line(self.screen, self.GRID_COLOR, (0, y), (self.WIDTH, y), 2)
+            pygame.draw.line(
+                self.background, self.GRID_COLOR, (0, y), (self.WIDTH, y), 2
+            )
+        pygame.draw.rect(self.background, self.WHITE, (0, self.HEIGHT, self.WIDTH, 60))
+        pygame.draw.line(
+            self.background, self.GRAY, (0, self.HEIGHT), (self.WIDTH, self.HEIGHT), 2
+        )
 
-    def draw_players(self):
-        x = self.player.position[0] * self.CELL_SIZE
-        y = self.player.position[1] * self.CELL_SIZE
+        pawn_size = self.CELL_SIZE - 2 * self.PAWN_INSET
+        self.pawn_sprites = {}
+        for pawn in (self.player, self.ai):
+            sprite = pygame.Surface((pawn_size, pawn_size), pygame.SRCALPHA)
+            self.draw_rounded_rect(
+                sprite, pawn.color, (0, 0, pawn_size, pawn_size), radius=5
+            )
+            self.pawn_sprites[self.owner_name(pawn)] = sprite
+
+        wall_length = self.CELL_SIZE * 2 - 10
+        wall_sizes = {
+            "horizontal": (wall_length, 10),
+            "vertical": (10, wall_length),
+        }
+        self.wall_sprites = {}
+        self.hint_sprites = {}
+        for wall_type, size in wall_sizes.items():
+            for owner, color in (
+                ("player", self.PLAYER_WALL_COLOR),
+                ("ai", self.AI_WALL_COLOR),
+            ):
+                sprite = pygame.Surface(size)
+                sprite.fill(color)
+                self.wall_sprites[(wall_type, owner)] = sprite
+
+            sprite = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.rect(sprite, (120, 120, 140), sprite.get_rect(), 1)
+            self.hint_sprites[wall_type] = sprite
+
+        self.stats_strip = pygame.Surface((self.WIDTH, 22), pygame.SRCALPHA)
+        self.stats_strip.fill((255, 255, 255, 200))
+
+        self.overlay = pygame.Surface((self.WIDTH, self.HEIGHT + 60), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 128))
+
+    def pawn_rect(self, x, y):
+        return pygame.Rect(
+            x * self.CELL_SIZE + self.PAWN_INSET,
+            y * self.CELL_SIZE + self.PAWN_INSET,
+            self.CELL_SIZE - 2 * self.PAWN_INSET,
+            self.CELL_SIZE - 2 * self.PAWN_INSET,
+        )
 
-        self.draw_rounded_rect(
-            self.screen,
-            self.player.color,
-            (x + 10, y + 10, self.CELL_SIZE - 20, self.CELL_SIZE - 20),
-            radius=5,
+    def wall_rect(self, wall_type, x, y):
+        if wall_type == "horizontal":
+            return pygame.Rect(
+                x * self.CELL_SIZE + 6,
+                y * self.CELL_SIZE - 4,
+                self.CELL_SIZE * 2 - 10,
+                10,
+            )
+        return pygame.Rect(
+            x * self.CELL_SIZE - 4,
+            y * self.CELL_SIZE + 6,
+            10,
+            self.CELL_SIZE * 2 - 10,
         )
 
-        x = self.ai.position[0] * self.CELL_SIZE
-        y = self.ai.position[1] * self.CELL_SIZE
+    def wall_owner(self, wall_type, x, y):
+        return self.wall_owners[(wall_type, x, y)]
 
-        self.draw_rounded_rect(
-            self.screen,
-            self.ai.color,
-            (x + 10, y + 10, self.CELL_SIZE - 20, self.CELL_SIZE - 20),
-            radius=5,
-        )
+    def wall_at(self, mx, my):
+        grid_x = mx // self.CELL_SIZE
+        grid_y = my // self.CELL_SIZE
+        dx = mx % self.CELL_SIZE
+        dy = my % self.CELL_SIZE
+
+        if dy < self.WALL_ZONE and grid_y > 0:
+            return ("horizontal", grid_x, grid_y)
+        elif dy > self.CELL_SIZE - self.WALL_ZONE and grid_y < self.GRID_SIZE - 1:
+            return ("horizontal", grid_x, grid_y + 1)
+        elif dx < self.WALL_ZONE and grid_x > 0:
+            return ("vertical", grid_x, grid_y)
+        elif dx > self.CELL_SIZE - self.WALL_ZONE and grid_x < self.GRID_SIZE - 1:
+            return ("vertical", grid_x + 1, grid_y)
+
+        return None
+
+    def hovered_wall(self):
+        if not self.player_turn:
+            return None
+
+        mx, my = pygame.mouse.get_pos()
+        if my >= self.HEIGHT:
+            return None
+
+        wall = self.wall_at(mx, my)
+        if wall is None or not self.can_place_wall(*wall):
+            return None
+        return wall
+
+    def draw_grid(self):
+        self.screen.blit(self.background, (0, 0))
+
+    def draw_players(self):
+        for pawn in (self.player, self.ai):
+            self.screen.blit(
+                self.pawn_sprites[self.owner_name(pawn)], self.pawn_rect(*pawn.position)
+            )
 
     def draw_walls(self):
         for x, y in self.horizontal_walls:
-            wall_color = (
-                self.PLAYER_WALL_COLOR
-                if (x, y) in self.wall_owners and self.wall_owners[(x, y)] == "player"
-                else self.AI_WALL_COLOR
-            )
-            pygame.draw.rect(
-                self.screen,
-                wall_color,
-                (
-                    x * self.CELL_SIZE + 6,
-                    y * self.CELL_SIZE - 4,
-                    self.CELL_SIZE * 2 - 10,
-                    10,
-                ),
+            self.screen.blit(
+                self.wall_sprites[("horizontal", self.wall_owner("horizontal", x, y))],
+                self.wall_rect("horizontal", x, y),
             )
 
         for x, y in self.vertical_walls:
-            wall_color = (
-                self.PLAYER_WALL_COLOR
-                if (x, y) in self.wall_owners and self.wall_owners[(x, y)] == "player"
-                else self.AI_WALL_COLOR
-            )
-            pygame.draw.rect(
-                self.screen,
-                wall_color,
-                (
-                    x * self.CELL_SIZE - 4,
-                    y * self.CELL_SIZE + 6,
-                    10,
-                    self.CELL_SIZE * 2 - 10,
-                ),
+            self.screen.blit(
+                self.wall_sprites[("vertical", self.wall_owner("vertical", x, y))],
+                self.wall_rect("vertical", x, y),
             )
 
-        if self.player_turn:
-            mx, my = pygame.mouse.get_pos()
-            if my < self.HEIGHT:
-                grid_x = mx // self.CELL_SIZE
-                grid_y = my // self.CELL_SIZE
-                dx = mx % self.CELL_SIZE
-                dy = my % self.CELL_SIZE
-
-                hint_color = (120, 120, 140, 150)
-
-                if dy < 20 and grid_y > 0:
-                    if self.is_valid_wall("horizontal", grid_x, grid_y):
-                        pygame.draw.rect(
-                            self.screen,
-                            hint_color,
-                            (
-                                grid_x * self.CELL_SIZE + 6,
-                                grid_y * self.CELL_SIZE - 4,
-                                self.CELL_SIZE * 2 - 10,
-                                10,
-                            ),
-                            1,
-                        )
-                elif dy > self.CELL_SIZE - 20 and grid_y < self.GRID_SIZE - 1:
-                    if self.is_valid_wall("horizontal", grid_x, grid_y + 1):
-                        pygame.draw.rect(
-                            self.screen,
-                            hint_color,
-                            (
-                                grid_x * self.CELL_SIZE + 6,
-                                (grid_y + 1) * self.CELL_SIZE - 4,
-                                self.CELL_SIZE * 2 - 10,
-                                10,
-                            ),
-                            1,
-                        )
+        hint = self.hovered_wall()
+        if hint is not None:
+            self.screen.blit(self.hint_sprites[hint[0]], self.wall_rect(*hint))
 
-                elif dx < 20 and grid_x > 0:
-                    if self.is_valid_wall("vertical", grid_x, grid_y):
-                        pygame.draw.rect(
-                            self.screen,
-                            hint_color,
-                            (
-                                grid_x * self.CELL_SIZE - 4,
-                                grid_y * self.CELL_SIZE + 6,
-                                10,
-                                self.CELL_SIZE * 2 - 10,
-                            ),
-                            1,
-                        )
-                elif dx > self.CELL_SIZE - 20 and grid_x < self.GRID_SIZE - 1:
-                    if self.is_valid_wall("vertical", grid_x + 1, grid_y):
-                        pygame.draw.rect(
-                            self.screen,
-                            hint_color,
-                            (
-                                (grid_x + 1) * self.CELL_SIZE - 4,
-                                grid_y * self.CELL_SIZE + 6,
-                                10,
-                                self.CELL_SIZE * 2 - 10,
-                            ),
-                            1,
-                        )
+    def ui_labels(self):
+        labels = [
+            (f"Your Walls: {self.player.walls}", self.player.color),
+            (f"AI Walls: {self.ai.walls}", self.ai.color),
+        ]
 
-    def draw_ui(self):
-        pygame.draw.rect(self.screen, self.WHITE, (0, self.HEIGHT, self.WIDTH, 60))
-        pygame.draw.line(
-            self.screen, self.GRAY, (0, self.HEIGHT), (self.WIDTH, self.HEIGHT), 2
-        )
+        if not self.game_over and self.ai_worker.is_thinking():
+            dots = "." * (pygame.time.get_ticks() // self.DOTS_INTERVAL % 4)
+            labels.append((f"AI Thinking{dots}", self.GREEN))
+        elif not self.game_over:
+            labels.append((f"{'Your' if self.player_turn else 'AI'} Turn", self.GREEN))
+        else:
+            labels.append((f"{self.winner} wins!", self.GREEN))
+
+        return tuple(labels)
 
-        player_text = self.ui_font.render(
-            f"Your Walls: {self.player.walls}", True, self.player.color
+    def draw_ui(self):
+        self.screen.blit(
+            self.background,
+            (0, self.HEIGHT),
+            pygame.Rect(0, self.HEIGHT, self.WIDTH, 60),
         )
-        ai_text = self.ui_font.render(f"AI Walls: {self.ai.walls}", True, self.ai.color)
 
-        if not self.game_over:
-            turn_text = self.ui_font.render(
-                f"{'Your' if self.player_turn else 'AI'} Turn", True, self.GREEN
-            )
+        for (text, color), x in zip(
+            self.ui_labels(), (20, self.WIDTH // 2 - 70, self.WIDTH - 140)
+        ):
+            label = self.render_text(self.ui_font, text, color)
+            self.screen.blit(label, (x, self.HEIGHT + 20))
+
+    def stats_summary(self):
+        if not self.show_stats or self.ai.stats is None:
+            return None
+        return self.ai.stats.summary()
+
+    def draw_stats(self):
+        summary = self.stats_summary()
+        if summary is None:
+            return
+
+        self.screen.blit(self.stats_strip, (0, 0))
+        label = self.render_text(self.stats_font, summary, self.BLACK)
+        self.screen.blit(label, (6, 3))
+
+    def toggle_stats(self):
+        if self.ai.stats is None:
+            self.ai.stats = SearchStats(log=True)
+        self.show_stats = not self.show_stats
+
+    def scene_items(self):
+        items = {
+            ("pawn", "player") + tuple(self.player.position),
+            ("pawn", "ai") + tuple(self.ai.position),
+            ("ui",) + self.ui_labels(),
+        }
+
+        for (wall_type, x, y), owner in self.wall_owners.items():
+            items.add(("wall", wall_type, x, y, owner))
+
+        hint = self.hovered_wall()
+        if hint is not None:
+            items.add(("hint",) + hint)
+
+        summary = self.stats_summary()
+        if summary is not None:
+            items.add(("stats", summary))
+
+        if self.show_end_popup:
+            items.add(("popup", self.winner))
+
+        return items
+
+    def item_rect(self, item):
+        if item[0] == "pawn":
+            return self.pawn_rect(item[2], item[3])
+        if item[0] in ("wall", "hint"):
+            return self.wall_rect(item[1], item[2], item[3])
+        if item[0] == "ui":
+            return pygame.Rect(0, self.HEIGHT, self.WIDTH, 60)
+        if item[0] == "stats":
+            return pygame.Rect(0, 0, self.WIDTH, 22)
+        return self.screen.get_rect()
+
+    def render_board(self):
+        scene = self.scene_items()
+
+        if self.needs_full_redraw or self.last_scene is None:
+            dirty = [self.screen.get_rect()]
         else:
-            turn_text = self.ui_font.render(f"{self.winner} wins!", True, self.GREEN)
+            dirty = [self.item_rect(item) for item in scene ^ self.last_scene]
+
+        self.last_scene = scene
+        self.needs_full_redraw = False
+
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.draw_grid()
+            self.draw_players()
+            self.draw_walls()
+            self.draw_stats()
+            self.draw_ui()
+            if self.show_end_popup:
+                self.draw_end_popup()
+        self.screen.set_clip(None)
 
-        self.screen.blit(player_text, (20, self.HEIGHT + 20))
-        self.screen.blit(ai_text, (200, self.HEIGHT + 20))
-        self.screen.blit(turn_text, (400, self.HEIGHT + 20))
+        return dirty
 
     def draw_start_screen(self):
         self.screen.fill(self.BACKGROUND)
 
-        title_shadow = self.title_font.render("QUORIDOR", True, (30, 30, 30))
-        title_text = self.title_font.render("QUORIDOR", True, self.DARK_GREEN)
+        title_shadow = self.render_text(self.title_font, "QUORIDOR", (30, 30, 30))
+        title_text = self.render_text(self.title_font, "QUORIDOR", self.DARK_GREEN)
         shadow_rect = title_text.get_rect(
             center=(self.WIDTH // 2 + 3, self.HEIGHT // 3 + 3)
         )
@@ -288,7 +422,7 @@ class QuoridorGame:
             border_color=self.BLACK,
         )
 
-        start_text = self.button_font.render("START", True, self.WHITE)
+        start_text = self.render_text(self.button_font, "START", self.WHITE)
         start_rect = start_text.get_rect(
             center=(self.WIDTH // 2, self.HEIGHT // 2 + button_height // 2)
         )
@@ -298,11 +432,12 @@ class QuoridorGame:
             "Use arrow keys to move your pawn",
             "Click between cells to place walls",
             "Reach the opposite side to win",
-            "You have 10 walls to block your opponent",
+            f"You have {self.wall_allowance} walls to block your opponent",
+            "Press U to undo and R to redo a turn",
         ]
 
         instruction_box_width = 460
-        instruction_box_height = 170
+        instruction_box_height = 205
         instruction_box_x = self.WIDTH // 2 - instruction_box_width // 2
         instruction_box_y = self.HEIGHT * 2 // 3
 
@@ -321,7 +456,7 @@ class QuoridorGame:
         )
 
         for i, instruction in enumerate(instructions):
-            inst_text = self.font.render(instruction, True, self.BLACK)
+            inst_text = self.render_text(self.font, instruction, self.BLACK)
             inst_rect = inst_text.get_rect(
                 center=(self.WIDTH // 2, instruction_box_y + 30 + i * 35)
             )
@@ -329,10 +464,17 @@ class QuoridorGame:
 
         return button_x, button_y, button_width, button_height
 
+    def popup_button(self):
+        popup_height = 300
+        popup_y = self.HEIGHT // 2 - popup_height // 2
+
+        button_width, button_height = 270, 80
+        button_x = self.WIDTH // 2 - button_width // 2
+        button_y = popup_y + popup_height - button_height - 40
+        return button_x, button_y, button_width, button_height
+
     def draw_end_popup(self):
-        overlay = pygame.Surface((self.WIDTH, self.HEIGHT + 60), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self.overlay, (0, 0))
 
         popup_width, popup_height = 400, 300
         popup_x = self.WIDTH // 2 - popup_width // 2
@@ -348,18 +490,18 @@ class QuoridorGame:
         )
 
         winner_color = self.BLUE if self.winner == "Player" else self.RED
-        winner_shadow = self.title_font.render(
-            f"{self.winner} WINS!", True, (30, 30, 30)
+        winner_shadow = self.render_text(
+            self.title_font, f"{self.winner} WINS!", (30, 30, 30)
+        )
+        winner_text = self.render_text(
+            self.title_font, f"{self.winner} WINS!", winner_color
         )
-        winner_text = self.title_font.render(f"{self.winner} WINS!", True, winner_color)
         shadow_rect = winner_shadow.get_rect(center=(self.WIDTH // 2 + 3, popup_y + 83))
         winner_rect = winner_text.get_rect(center=(self.WIDTH // 2, popup_y + 80))
         self.screen.blit(winner_shadow, shadow_rect)
         self.screen.blit(winner_text, winner_rect)
 
-        button_width, button_height = 270, 80
-        button_x = self.WIDTH // 2 - button_width // 2
-        button_y = popup_y + popup_height - button_height - 40
+        button_x, button_y, button_width, button_height = self.popup_button()
 
         self.draw_rounded_rect(
             self.screen,
@@ -370,7 +512,7 @@ class QuoridorGame:
             border_color=self.BLACK,
         )
 
-        again_text = self.button_font.render("PLAY AGAIN", True, self.WHITE)
+        again_text = self.render_text(self.button_font, "PLAY AGAIN", self.WHITE)
         again_rect = again_text.get_rect(
             center=(self.WIDTH // 2, button_y + button_height // 2)
         )
@@ -378,286 +520,155 @@ class QuoridorGame:
 
         return button_x, button_y, button_width, button_height
 
-    def is_valid_wall(self, wall_type, x, y):
-        if wall_type == "horizontal":
-            if x >= self.GRID_SIZE - 1 or y <= 0 or y >= self.GRID_SIZE:
-                return False
-        elif wall_type == "vertical":
-            if x <= 0 or y >= self.GRID_SIZE - 1 or x >= self.GRID_SIZE:
-                return False
-
-        if wall_type == "horizontal" and (x, y) in self.horizontal_walls:
-            return False
-        if wall_type == "vertical" and (x, y) in self.vertical_walls:
+    def place_wall(self, mx, my):
+        if self.player.walls <= 0:
             return False
 
-        if wall_type == "horizontal":
-            if (x - 1, y) in self.horizontal_walls or (
-                x + 1,
-                y,
-            ) in self.horizontal_walls:
-                return False
-
-            if (x + 1, y - 1) in self.vertical_walls:
-                return False
-
-        elif wall_type == "vertical":
-            if (x, y - 1) in self.vertical_walls or (x, y + 1) in self.vertical_walls:
-                return False
-
-            if (x - 1, y + 1) in self.horizontal_walls:
-                return False
-
-        temp_horizontal = self.horizontal_walls.copy()
-        temp_vertical = self.vertical_walls.copy()
-
-        if wall_type == "horizontal":
-            temp_horizontal.add((x, y))
-        else:
-            temp_vertical.add((x, y))
-
-        if not self.has_path_to_goal(
-            self.player.position, 0, temp_horizontal, temp_vertical
-        ) or not self.has_path_to_goal(
-            self.ai.position, self.GRID_SIZE - 1, temp_horizontal, temp_vertical
-        ):
+        wall = self.wall_at(mx, my)
+        if wall is None or not self.can_place_wall(*wall):
             return False
 
+        self.push_move(self.player, "wall", wall)
         return True
 
-    def place_wall(self, mx, my):
-        if self.player.walls <= 0:
-            return False
-
-        grid_x = mx // self.CELL_SIZE
-        grid_y = my // self.CELL_SIZE
-        dx = mx % self.CELL_SIZE
-        dy = my % self.CELL_SIZE
+    def move_player(self, dx, dy):
+        x, y = self.player.position
+        valid_moves = self.get_valid_moves(self.player.position)
 
-        if dy < 20 and grid_y > 0:
-            if self.is_valid_wall("horizontal", grid_x, grid_y):
-                self.horizontal_walls.add((grid_x, grid_y))
-                self.wall_owners[(grid_x, grid_y)] = "player"
-                self.player.walls -= 1
-                return True
-        elif dy > self.CELL_SIZE - 20 and grid_y < self.GRID_SIZE - 1:
-            if self.is_valid_wall("horizontal", grid_x, grid_y + 1):
-                self.horizontal_walls.add((grid_x, grid_y + 1))
-                self.wall_owners[(grid_x, grid_y + 1)] = "player"
-                self.player.walls -= 1
-                return True
-        elif dx < 20 and grid_x > 0:
-            if self.is_valid_wall("vertical", grid_x, grid_y):
-                self.vertical_walls.add((grid_x, grid_y))
-                self.wall_owners[(grid_x, grid_y)] = "player"
-                self.player.walls -= 1
-                return True
-        elif dx > self.CELL_SIZE - 20 and grid_x < self.GRID_SIZE - 1:
-            if self.is_valid_wall("vertical", grid_x + 1, grid_y):
-                self.vertical_walls.add((grid_x + 1, grid_y))
-                self.wall_owners[(grid_x + 1, grid_y)] = "player"
-                self.player.walls -= 1
+        for step in (1, 2):
+            target = (x + dx * step, y + dy * step)
+            if target in valid_moves:
+                self.push_move(self.player, "move", target)
                 return True
 
         return False
 
-    def is_blocked_by_wall(self, current_x, current_y, target_x, target_y):
-        dx = target_x - current_x
-        dy = target_y - current_y
-
-        if dx == 0 and dy == -1:
-            return (current_x, current_y) in self.horizontal_walls or (
-                current_x - 1,
-                current_y,
-            ) in self.horizontal_walls
-        elif dx == 1 and dy == 0:
-            return (current_x + 1, current_y) in self.vertical_walls or (
-                current_x + 1,
-                current_y - 1,
-            ) in self.vertical_walls
-        elif dx == 0 and dy == 1:
-            return (current_x, current_y + 1) in self.horizontal_walls or (
-                current_x - 1,
-                current_y + 1,
-            ) in self.horizontal_walls
-        elif dx == -1 and dy == 0:
-            return (current_x, current_y) in self.vertical_walls or (
-                current_x,
-                current_y - 1,
-            ) in self.vertical_walls
+    def undo_turn(self):
+        self.ai_worker.cancel()
+        while self.move_stack:
+            if self.pop_move().pawn is self.player:
+                return True
 
         return False
 
-    def get_valid_moves(self, pos):
-        x, y = pos
-        moves = []
-
-        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-
-            if not (0 <= nx < self.GRID_SIZE and 0 <= ny < self.GRID_SIZE):
-                continue
-
-            if self.is_blocked_by_wall(x, y, nx, ny):
-                continue
-
-            other_pos = (
-                self.ai.position
-                if pos == self.player.position
-                else self.player.position
-            )
-            if [nx, ny] == other_pos:
-                jx, jy = nx + dx, ny + dy
-
-                if not (0 <= jx < self.GRID_SIZE and 0 <= jy < self.GRID_SIZE):
-                    continue
-
-                if self.is_blocked_by_wall(nx, ny, jx, jy):
-                    continue
-
-                moves.append((jx, jy))
-            else:
-                moves.append((nx, ny))
-
-        return moves
-
-    def has_path_to_goal(self, pos, goal_row, h_walls, v_walls):
-        queue = deque([tuple(pos)])
-        visited = set([tuple(pos)])
+    def redo_turn(self):
+        if not self.player_turn or not self.redo_stack:
+            return False
 
-        while queue:
-            x, y = queue.popleft()
+        self.ai_worker.cancel()
+        while self.redo_stack:
+            self.redo_move()
+            if self.player_turn:
+                break
 
-            if goal_row == 0 and y == 0:
-                return True
-            if goal_row == self.GRID_SIZE - 1 and y == self.GRID_SIZE - 1:
-                return True
+        return True
 
-            for nx, ny in self.get_valid_moves_for_pathfinding(
-                (x, y), h_walls, v_walls
-            ):
-                if (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    queue.append((nx, ny))
+    def check_win(self):
+        if super().check_win():
+            self.show_end_popup = True
+            self.save_record()
+            return True
 
         return False
 
-    def is_blocked_by_wall_for_pathfinding(
-        self, current_x, current_y, target_x, target_y, h_walls, v_walls
-    ):
-        dx = target_x - current_x
-        dy = target_y - current_y
-
-        if dx == 0 and dy == -1:
-            return (current_x, current_y) in h_walls or (
-                current_x - 1,
-                current_y,
-            ) in h_walls
-        elif dx == 1 and dy == 0:
-            return (current_x + 1, current_y) in v_walls or (
-                current_x + 1,
-                current_y - 1,
-            ) in v_walls
-        elif dx == 0 and dy == 1:
-            return (current_x, current_y + 1) in h_walls or (
-                current_x - 1,
-                current_y + 1,
-            ) in h_walls
-        elif dx == -1 and dy == 0:
-            return (current_x, current_y) in v_walls or (
-                current_x,
-                current_y - 1,
-            ) in v_walls
+    def notify_ai_done(self):
+        pygame.event.post(pygame.event.Event(self.AI_DONE))
 
-        return False
+    def next_events(self):
+        if (
+            not self.show_start_screen
+            and not self.game_over
+            and not self.player_turn
+            and self.ai_worker.is_idle()
+        ):
+            return pygame.event.get()
 
-    def get_valid_moves_for_pathfinding(self, pos, h_walls, v_walls):
-        x, y = pos
-        moves = []
+        if self.ai_worker.is_thinking():
+            timeout = self.DOTS_INTERVAL - pygame.time.get_ticks() % self.DOTS_INTERVAL
+        else:
+            timeout = 0
 
-        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
+        event = pygame.event.wait(timeout)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        return events + pygame.event.get()
 
-            if not (0 <= nx < self.GRID_SIZE and 0 <= ny < self.GRID_SIZE):
-                continue
+    def update_ai_turn(self):
+        if self.game_over or self.player_turn or self.check_win():
+            return
 
-            if self.is_blocked_by_wall_for_pathfinding(x, y, nx, ny, h_walls, v_walls):
-                continue
+        if self.ai_worker.is_idle():
+            self.ai_worker.start(self)
+            return
 
-            moves.append((nx, ny))
+        best_move = self.ai_worker.poll()
+        if best_move is None:
+            return
 
-        return moves
+        self.push_move(self.ai, best_move[0], best_move[1])
 
-    def check_win(self):
-        if self.player.position[1] == 0:
-            self.game_over = True
-            self.winner = "Player"
-            self.show_end_popup = True
-            return True
+    def new_record(self):
+        return GameRecord(self.GRID_SIZE, self.wall_allowance, {"mode": "human"})
 
-        if self.ai.position[1] == self.GRID_SIZE - 1:
-            self.game_over = True
-            self.winner = "AI"
-            self.show_end_popup = True
-            return True
+    def save_record(self):
+        if self.record_path is None:
+            return
 
-        return False
+        self.record.moves = [(entry.action, entry.move) for entry in self.move_stack]
+        self.record.winner = self.winner
+        with RecordWriter(self.record_path) as writer:
+            writer.write(self.record)
 
     def reset_game(self):
-        self.horizontal_walls = set()
-        self.vertical_walls = set()
-        self.wall_owners = {}
-        self.player.position = [4, 8]
-        self.ai.position = [4, 0]
-        self.player.walls = 10
-        self.ai.walls = 10
-        self.player_turn = True
-        self.game_over = False
-        self.winner = None
+        self.ai_worker.cancel()
+        super().reset_game()
         self.show_end_popup = False
+        self.record = self.new_record()
+        if self.ai.stats is not None:
+            self.ai.stats.new_game()
 
     def run_game(self):
         running = True
         while running:
             if self.show_start_screen:
-                button_x, button_y, button_width, button_height = (
-                    self.draw_start_screen()
-                )
+                if self.needs_full_redraw:
+                    self.start_button = self.draw_start_screen()
+                    self.needs_full_redraw = False
+                    pygame.display.flip()
 
-                for event in pygame.event.get():
+                for event in self.next_events():
                     if event.type == pygame.QUIT:
                         running = False
                     elif event.type == pygame.MOUSEBUTTONDOWN:
                         mx, my = event.pos
+                        button_x, button_y, button_width, button_height = (
+                            self.start_button
+                        )
                         if (
                             button_x <= mx <= button_x + button_width
                             and button_y <= my <= button_y + button_height
                         ):
                             self.show_start_screen = False
+                            self.needs_full_redraw = True
             else:
-                self.screen.fill(self.WHITE)
-                self.draw_grid()
-                self.draw_players()
-                self.draw_walls()
-                self.draw_ui()
-
-                if self.show_end_popup:
-                    button_x, button_y, button_width, button_height = (
-                        self.draw_end_popup()
-                    )
-
                 if not self.game_over and not self.show_end_popup:
                     self.check_win()
 
-                for event in pygame.event.get():
+                pygame.display.update(self.render_board())
+
+                for event in self.next_events():
                     if event.type == pygame.QUIT:
                         running = False
+                    elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                        self.needs_full_redraw = True
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                        self.toggle_stats()
 
                     if self.show_end_popup:
                         if event.type == pygame.MOUSEBUTTONDOWN:
                             mx, my = event.pos
+                            button_x, button_y, button_width, button_height = (
+                                self.popup_button()
+                            )
                             if (
                                 button_x <= mx <= button_x + button_width
                                 and button_y <= my <= button_y + button_height
@@ -668,100 +679,59 @@ class QuoridorGame:
                     if self.game_over:
                         continue
 
-                    if self.player_turn:
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_u:
+                        self.undo_turn()
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                        self.redo_turn()
+                    elif self.player_turn:
                         if event.type == pygame.KEYDOWN:
-                            moved = False
-
-                            if event.key == pygame.K_LEFT:
-                                valid_moves = self.get_valid_moves(self.player.position)
-                                if (
-                                    self.player.position[0] - 1,
-                                    self.player.position[1],
-                                ) in valid_moves:
-                                    self.player.position[0] -= 1
-                                    moved = True
-                                elif (
-                                    self.player.position[0] - 2,
-                                    self.player.position[1],
-                                ) in valid_moves:
-                                    self.player.position[0] -= 2
-                                    moved = True
-
-                            elif event.key == pygame.K_RIGHT:
-                                valid_moves = self.get_valid_moves(self.player.position)
-                                if (
-                                    self.player.position[0] + 1,
-                                    self.player.position[1],
-                                ) in valid_moves:
-                                    self.player.position[0] += 1
-                                    moved = True
-                                elif (
-                                    self.player.position[0] + 2,
-                                    self.player.position[1],
-                                ) in valid_moves:
-                                    self.player.position[0] += 2
-                                    moved = True
-
-                            elif event.key == pygame.K_UP:
-                                valid_moves = self.get_valid_moves(self.player.position)
-                                if (
-                                    self.player.position[0],
-                                    self.player.position[1] - 1,
-                                ) in valid_moves:
-                                    self.player.position[1] -= 1
-                                    moved = True
-                                elif (
-                                    self.player.position[0],
-                                    self.player.position[1] - 2,
-                                ) in valid_moves:
-                                    self.player.position[1] -= 2
-                                    moved = True
-
-                            elif event.key == pygame.K_DOWN:
-                                valid_moves = self.get_valid_moves(self.player.position)
-                                if (
-                                    self.player.position[0],
-                                    self.player.position[1] + 1,
-                                ) in valid_moves:
-                                    self.player.position[1] += 1
-                                    moved = True
-                                elif (
-                                    self.player.position[0],
-                                    self.player.position[1] + 2,
-                                ) in valid_moves:
-                                    self.player.position[1] += 2
-                                    moved = True
-
-                            if moved:
-                                self.player_turn = False
+                            directions = {
+                                pygame.K_LEFT: (-1, 0),
+                                pygame.K_RIGHT: (1, 0),
+                                pygame.K_UP: (0, -1),
+                                pygame.K_DOWN: (0, 1),
+                            }
+
+                            if event.key in directions:
+                                self.move_player(*directions[event.key])
 
                         elif event.type == pygame.MOUSEBUTTONDOWN:
                             if event.button == 1:
                                 mx, my = event.pos
                                 if my < self.HEIGHT:
-                                    if self.place_wall(mx, my):
-                                        self.player_turn = False
-                    else:
-
-                        best_move = self.ai.make_move(self, self.player)
-
-                        if best_move == "wall":
-                            for wall in self.horizontal_walls:
-                                if wall not in self.wall_owners:
-                                    self.wall_owners[wall] = "ai"
-
-                            for wall in self.vertical_walls:
-                                if wall not in self.wall_owners:
-                                    self.wall_owners[wall] = "ai"
+                                    self.place_wall(mx, my)
 
-                        self.player_turn = True
+                self.update_ai_turn()
 
-            pygame.display.flip()
             self.clock.tick(self.FPS)
 
+        self.ai_worker.cancel()
+        if self.trace_path and self.ai.stats is not None:
+            self.ai.stats.dump(self.trace_path)
         pygame.quit()
 
 
-if __name__ == "__main__":
-    game = QuoridorGame()
+def main():
+    parser = argparse.ArgumentParser(description="Play Quoridor against the AI")
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--walls", type=int, default=10)
+    parser.add_argument(
+        "--stats", action="store_true", help="show and log search statistics"
+    )
+    parser.add_argument("--trace", help="write the per-turn search trace here")
+    parser.add_argument("--record", help="append game records to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    game = QuoridorGame(
+        grid_size=args.size,
+        walls=args.walls,
+        stats=args.stats,
+        trace_path=args.trace,
+        record_path=args.record,
+    )
     game.run_game()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import math
+import random
+import time
+
+from ai import AI, SearchCancelled
+
+
+class Node:
+    def __init__(self, parent, action, move, side, key):
+        self.parent = parent
+        self.action = action
+        self.move = move
+        self.side = side
+        self.key = key
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+    def best_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.wins / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+class MCTSAI(AI):
+    def __init__(
+        self, position, color, walls, grid_size, playouts=400, seed=None, **kwargs
+    ):
+        super().__init__(position, color, walls, grid_size, **kwargs)
+        if playouts is None and self.time_limit is None and self.node_limit is None:
+            playouts = 400
+        self.playouts = playouts
+        self.rng = random.Random(seed)
+        self.exploration = 1.4
+        self.playout_depth = max(24, 3 * grid_size)
+        self.wall_rate = 0.25
+        self.root = None
+
+    def search(self, game, player):
+        me = game.opponent(player)
+        root = self.reuse_root(game, me)
+        self.nodes = 0
+
+        deadline = (
+            None if self.time_limit is None else time.perf_counter() + self.time_limit
+        )
+        while True:
+            if self.cancelled:
+                raise SearchCancelled()
+            if self.playouts is not None and self.nodes >= self.playouts:
+                break
+            if self.node_limit is not None and self.nodes >= self.node_limit:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            self.iterate(game, root)
+            self.nodes += 1
+
+        if not root.children:
+            self.root = None
+            return None, None, 0
+
+        best = max(root.children, key=lambda child: child.visits)
+        best.parent = None
+        self.root = best
+        return best.action, best.move, best.wins / best.visits
+
+    def reuse_root(self, game, me):
+        side = game.side(me)
+        if self.root is not None:
+            for child in self.root.children:
+                if child.key == game.hash and child.side != side:
+                    child.parent = None
+                    return child
+
+        return Node(None, None, None, 1 - side, game.hash)
+
+    def pawn_to_move(self, game, node):
+        return game.ai if node.side == 0 else game.player
+
+    def iterate(self, game, root):
+        node = root
+        played = []
+
+        while True:
+            if self.winner(game) is not None:
+                break
+
+            pawn = self.pawn_to_move(game, node)
+            if node.untried is None:
+                moves = list(self.get_moves(game, pawn, game.opponent(pawn)))
+                moves.reverse()
+                node.untried = moves
+
+            if node.untried:
+                action, move = node.untried.pop()
+                played.append((pawn, action, move, game.apply_move(pawn, action, move)))
+                child = Node(node, action, move, game.side(pawn), game.hash)
+                node.children.append(child)
+                node = child
+                break
+
+            if not node.children:
+                break
+
+            node = node.best_child(self.exploration)
+            played.append(
+                (
+                    pawn,
+                    node.action,
+                    node.move,
+                    game.apply_move(pawn, node.action, node.move),
+                )
+            )
+
+        try:
+            winner = self.playout(game, self.pawn_to_move(game, node))
+        finally:
+            for pawn, action, move, previous in reversed(played):
+                game.undo_move(pawn, action, move, previous)
+
+        while node is not None:
+            node.visits += 1
+            if winner == node.side:
+                node.wins += 1
+            elif winner is None:
+                node.wins += 0.5
+            node = node.parent
+
+    def winner(self, game):
+        if game.player.position[1] == 0:
+            return 0
+        if game.ai.position[1] == game.GRID_SIZE - 1:
+            return 1
+        return None
+
+    def playout(self, game, pawn):
+        played = []
+        try:
+            for _ in range(self.playout_depth):
+                winner = self.winner(game)
+                if winner is not None:
+                    return winner
+
+                action, move = self.playout_move(game, pawn)
+                if action is not None:
+                    played.append(
+                        (pawn, action, move, game.apply_move(pawn, action, move))
+                    )
+                pawn = game.opponent(pawn)
+
+            winner = self.winner(game)
+            if winner is not None:
+                return winner
+
+            distance = game.distance_to_goal(pawn)
+            opponent_distance = game.distance_to_goal(game.opponent(pawn))
+            if distance is None or opponent_distance is None:
+                return None
+            if distance <= opponent_distance:
+                return game.side(pawn)
+            return 1 - game.side(pawn)
+        finally:
+            for pawn, action, move, previous in reversed(played):
+                game.undo_move(pawn, action, move, previous)
+
+    def playout_move(self, game, pawn):
+        opponent = game.opponent(pawn)
+
+        if pawn.walls > 0 and self.rng.random() < self.wall_rate:
+            distance = game.distance_to_goal(pawn)
+            opponent_distance = game.distance_to_goal(opponent)
+            if opponent_distance is not None and opponent_distance <= distance:
+                walls = self.get_wall_options(game, opponent)
+                self.rng.shuffle(walls)
+                for wall in walls[:3]:
+                    if game.is_valid_wall(*wall):
+                        return "wall", wall
+
+        distances = game.distance_maps[game.goal_row(pawn)]
+        best = None
+        best_distance = None
+        for move in game.get_valid_moves(pawn.position):
+            distance = distances.get(*move)
+            if distance is None:
+                continue
+            if best is None or distance < best_distance:
+                best, best_distance = move, distance
+            elif distance == best_distance and self.rng.random() < 0.5:
+                best = move
+
+        if best is None:
+            return None, None
+        return "move", best
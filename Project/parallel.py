@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+import pickle
+import threading
+
+from ai import AI, SearchCancelled, SearchTimeout
+
+REPORT_INTERVAL = 256
+
+worker_engine = None
+
+
+class RootWorker(AI):
+    def __init__(self, settings, bound, stop, spent, state_buffer):
+        super().__init__(
+            None, None, 0, settings["grid_size"], table_size=settings["table_size"]
+        )
+        self.consider_all_walls = settings["consider_all_walls"]
+        self.wall_width = settings["wall_width"]
+        self.defense_width = settings["defense_width"]
+        self.batch_threshold = settings["batch_threshold"]
+        self.bound = bound
+        self.stop = stop
+        self.spent = spent
+        self.state_buffer = state_buffer
+        self.search_id = None
+        self.state = None
+        self.limit = None
+        self.reported = 0
+
+    def out_of_budget(self):
+        if self.limit is not None and self.nodes - self.reported >= REPORT_INTERVAL:
+            with self.spent.get_lock():
+                self.spent.value += self.nodes - self.reported
+                spent = self.spent.value
+            self.reported = self.nodes
+            if spent >= self.limit:
+                self.stop.value = 1
+        return bool(self.stop.value)
+
+    def search_move(self, task):
+        search_id, size, side, index, action, move, depth, limit = task
+        if search_id != self.search_id:
+            self.search_id = search_id
+            self.state = pickle.loads(self.state_buffer[:size])
+            self.transposition_table.new_search()
+
+        state = self.state
+        me = state.ai if side == 1 else state.player
+        player = state.opponent(me)
+        alpha = self.bound.value
+
+        self.nodes = 0
+        self.limit = limit
+        self.reported = 0
+        self.budget_active = True
+        previous = state.apply_move(me, action, move)
+        try:
+            _, _, score = self.minimax(
+                state, player, depth - 1, alpha, float("inf"), False
+            )
+        except SearchTimeout:
+            return index, None, alpha, self.nodes
+        finally:
+            state.undo_move(me, action, move, previous)
+
+        with self.bound.get_lock():
+            if score > self.bound.value:
+                self.bound.value = score
+        return index, score, alpha, self.nodes
+
+
+def init_worker(settings, bound, stop, spent, state_buffer):
+    global worker_engine
+    worker_engine = RootWorker(settings, bound, stop, spent, state_buffer)
+
+
+def search_root_move(task):
+    return worker_engine.search_move(task)
+
+
+class ParallelAI(AI):
+    def __init__(self, position, color, walls, grid_size, workers=None, **kwargs):
+        super().__init__(position, color, walls, grid_size, **kwargs)
+        self.workers = workers or os.cpu_count()
+        self.pool = None
+        self.bound = None
+        self.stop = None
+        self.spent = None
+        self.state_buffer = None
+        self.buffer_size = 1 << 16
+        self.search_id = 0
+
+    def start_pool(self):
+        if self.pool is not None:
+            return
+
+        self.bound = multiprocessing.Value("d", float("-inf"))
+        self.stop = multiprocessing.RawValue("b", 0)
+        self.spent = multiprocessing.Value("q", 0)
+        self.state_buffer = multiprocessing.RawArray("c", self.buffer_size)
+        settings = {
+            "grid_size": self.grid_size,
+            "table_size": self.transposition_table.size,
+            "consider_all_walls": self.consider_all_walls,
+            "wall_width": self.wall_width,
+            "defense_width": self.defense_width,
+            "batch_threshold": self.batch_threshold,
+        }
+        self.pool = multiprocessing.Pool(
+            self.workers,
+            initializer=init_worker,
+            initargs=(settings, self.bound, self.stop, self.spent, self.state_buffer),
+        )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def cancel(self):
+        super().cancel()
+        self.halt()
+
+    def halt(self):
+        if self.stop is not None:
+            self.stop.value = 1
+
+    def share_state(self, game):
+        blob = pickle.dumps(game.copy())
+        if len(blob) > self.buffer_size:
+            self.close()
+            while len(blob) > self.buffer_size:
+                self.buffer_size *= 2
+
+        self.start_pool()
+        self.state_buffer[: len(blob)] = blob
+        return len(blob)
+
+    def search(self, game, player):
+        self.start_pool()
+        self.stop.value = 0
+        self.nodes = 0
+        self.completed_depth = 0
+
+        me = game.opponent(player)
+        moves = self.order_moves(
+            game, self.get_moves(game, me, player), None, self.search_depth, me
+        )
+        if not moves:
+            return None, None, self.evaluate_state(game, player)
+
+        self.search_id += 1
+        size = self.share_state(game)
+        side = game.side(me)
+
+        if self.time_limit is None and self.node_limit is None:
+            best = self.root_pass(size, side, moves, self.search_depth, None)
+        else:
+            timer = None
+            if self.time_limit is not None:
+                timer = threading.Timer(self.time_limit, self.halt)
+                timer.start()
+            best = None
+            try:
+                for depth in range(1, self.max_depth + 1):
+                    limit = None if depth == 1 else self.node_limit
+                    result = self.root_pass(size, side, moves, depth, limit)
+                    if result is None:
+                        break
+
+                    best = result
+                    self.completed_depth = depth
+                    moves.remove((best[0], best[1]))
+                    moves.insert(0, (best[0], best[1]))
+                    if self.node_limit is not None and self.nodes >= self.node_limit:
+                        break
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+        if self.cancelled:
+            raise SearchCancelled()
+        if best is None:
+            action, move = moves[0]
+            return action, move, self.evaluate_state(game, player)
+        return best
+
+    def root_pass(self, size, side, moves, depth, limit):
+        self.bound.value = float("-inf")
+        self.spent.value = self.nodes
+        tasks = [
+            (self.search_id, size, side, index, action, move, depth, limit)
+            for index, (action, move) in enumerate(moves)
+        ]
+        results = self.pool.map(search_root_move, tasks, chunksize=1)
+
+        self.nodes += sum(nodes for _, _, _, nodes in results)
+        if any(score is None for _, score, _, _ in results):
+            return None
+
+        exact = [result for result in results if result[1] > result[2]]
+        if not exact:
+            action, move = moves[0]
+            return action, move, results[0][1]
+
+        index, score, _, _ = max(exact, key=lambda result: (result[1], -result[0]))
+        action, move = moves[index]
+        return action, move, score
@@ -0,0 +1,124 @@
+import json
+import struct
+import time
+
+from rules import replay
+
+MAGIC = b"QG"
+HEADER = struct.Struct("<2sBBBBIHH")
+RESULTS = {"Player": 0, "AI": 1, None: 2}
+WINNERS = {code: winner for winner, code in RESULTS.items()}
+
+
+class GameRecord:
+    def __init__(self, grid_size=9, walls=10, metadata=None, timestamp=None):
+        self.grid_size = grid_size
+        self.walls = walls
+        self.metadata = metadata or {}
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+        self.moves = []
+        self.winner = None
+
+    def add(self, action, move):
+        self.moves.append((action, move))
+
+    def code_size(self):
+        cells = self.grid_size * self.grid_size
+        slots = (self.grid_size - 1) * (self.grid_size - 1)
+        return 1 if cells + 2 * slots < 0xFF else 2
+
+    def encode_move(self, action, move):
+        if action is None:
+            return 0xFF if self.code_size() == 1 else 0xFFFF
+
+        cells = self.grid_size * self.grid_size
+        slot_size = self.grid_size - 1
+        if action == "move":
+            return move[1] * self.grid_size + move[0]
+
+        wall_type, x, y = move
+        if wall_type == "horizontal":
+            return cells + (y - 1) * slot_size + x
+        return cells + slot_size * slot_size + y * slot_size + x - 1
+
+    def decode_move(self, code):
+        if code == (0xFF if self.code_size() == 1 else 0xFFFF):
+            return None, None
+
+        cells = self.grid_size * self.grid_size
+        slot_size = self.grid_size - 1
+        if code < cells:
+            return "move", (code % self.grid_size, code // self.grid_size)
+
+        index = code - cells
+        if index < slot_size * slot_size:
+            return "wall", ("horizontal", index % slot_size, index // slot_size + 1)
+        index -= slot_size * slot_size
+        return "wall", ("vertical", index % slot_size + 1, index // slot_size)
+
+    def encode(self):
+        metadata = json.dumps(self.metadata, separators=(",", ":")).encode()
+        codes = [self.encode_move(action, move) for action, move in self.moves]
+        layout = "B" if self.code_size() == 1 else "H"
+        return (
+            HEADER.pack(
+                MAGIC,
+                self.grid_size,
+                self.walls,
+                RESULTS[self.winner],
+                0,
+                self.timestamp,
+                len(codes),
+                len(metadata),
+            )
+            + metadata
+            + struct.pack(f"<{len(codes)}{layout}", *codes)
+        )
+
+    def replay(self):
+        return replay(self.moves, self.grid_size, self.walls)
+
+
+class RecordWriter:
+    def __init__(self, path):
+        self.handle = open(path, "ab")
+
+    def write(self, record):
+        self.handle.write(record.encode())
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(path):
+    with open(path, "rb") as handle:
+        while True:
+            header = handle.read(HEADER.size)
+            if not header:
+                return
+            if len(header) < HEADER.size:
+                raise ValueError(f"truncated game record in {path}")
+
+            magic, grid_size, walls, result, _, timestamp, plies, metadata_size = (
+                HEADER.unpack(header)
+            )
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a game record file")
+
+            record = GameRecord(
+                grid_size, walls, json.loads(handle.read(metadata_size)), timestamp
+            )
+            record.winner = WINNERS[result]
+
+            layout = "B" if record.code_size() == 1 else "H"
+            data = handle.read(plies * struct.calcsize(layout))
+            for code in struct.unpack(f"<{plies}{layout}", data):
+                record.moves.append(record.decode_move(code))
+            yield record
@@ -0,0 +1,335 @@
+from bitboard import DIRECTIONS, BitBoard
+from player import Player
+from distance import DistanceMap
+from zobrist import Zobrist
+
+
+def start_positions(grid_size):
+    return [grid_size // 2, grid_size - 1], [grid_size // 2, 0]
+
+
+def start_position(grid_size=9, walls=10):
+    player, ai = start_positions(grid_size)
+    return GameState(Player(player, None, walls), Player(ai, None, walls), grid_size)
+
+
+def replay(moves, grid_size=9, walls=10):
+    state = start_position(grid_size, walls)
+    yield state
+
+    for action, move in moves:
+        mover = state.player if state.player_turn else state.ai
+        if action == "move":
+            if move not in state.get_valid_moves(mover.position):
+                raise ValueError(f"illegal pawn move {move}")
+        elif action == "wall":
+            if mover.walls <= 0 or not state.is_valid_wall(*move):
+                raise ValueError(f"illegal wall {move}")
+
+        state.push_move(mover, action, move)
+        state.check_win()
+        yield state
+
+
+class Move:
+    def __init__(self, pawn, action, move):
+        self.pawn = pawn
+        self.action = action
+        self.move = move
+        self.previous = None
+        self.player_turn = None
+
+
+class GameState:
+    def __init__(self, player, ai, grid_size=9):
+        self.GRID_SIZE = grid_size
+
+        self.horizontal_walls = set()
+        self.vertical_walls = set()
+        self.wall_owners = {}
+        self.move_stack = []
+        self.redo_stack = []
+        self.board = BitBoard(grid_size)
+        self.batch_evaluator = None
+        self.stats = None
+        self.distance_maps = {
+            0: DistanceMap(self.board, 0),
+            grid_size - 1: DistanceMap(self.board, grid_size - 1),
+        }
+
+        self.player = player
+        self.ai = ai
+
+        self.player_turn = True
+        self.game_over = False
+        self.winner = None
+
+        self.wall_allowance = max(player.walls, ai.walls)
+        self.zobrist = Zobrist(grid_size, self.wall_allowance)
+        self.hash = self.zobrist.hash_state(self)
+        self.clear_wall_cache()
+
+    def copy(self):
+        state = GameState(
+            Player(list(self.player.position), self.player.color, self.player.walls),
+            Player(list(self.ai.position), self.ai.color, self.ai.walls),
+            self.GRID_SIZE,
+        )
+
+        for (wall_type, x, y), owner in self.wall_owners.items():
+            state.add_wall(wall_type, x, y, owner)
+
+        state.wall_allowance = self.wall_allowance
+        state.zobrist = self.zobrist
+        state.hash = self.hash
+        state.player_turn = self.player_turn
+        state.game_over = self.game_over
+        state.winner = self.winner
+        return state
+
+    def side(self, pawn):
+        return 0 if pawn is self.player else 1
+
+    def goal_row(self, pawn):
+        return 0 if pawn is self.player else self.GRID_SIZE - 1
+
+    def opponent(self, pawn):
+        return self.ai if pawn is self.player else self.player
+
+    def owner_name(self, pawn):
+        return "player" if pawn is self.player else "ai"
+
+    def is_valid_wall(self, wall_type, x, y):
+        if self.stats is not None:
+            self.stats.count("wall_checks")
+        if not self.board.wall_fits(wall_type, x, y):
+            return False
+
+        routes = self.get_routes()
+        if routes is None:
+            return False
+        return self.board.keeps_paths(wall_type, x, y, routes)
+
+    def clear_wall_cache(self):
+        self.routes = None
+        self.legal_walls = None
+
+    def get_routes(self):
+        if self.routes is None:
+            self.routes = self.board.routes(
+                [
+                    (self.player.position[0], self.player.position[1], 0),
+                    (self.ai.position[0], self.ai.position[1], self.GRID_SIZE - 1),
+                ]
+            )
+
+        return self.routes
+
+    def legal_wall_masks(self):
+        if self.legal_walls is None:
+            self.legal_walls = self.board.legal_walls(self.get_routes())
+
+        return self.legal_walls
+
+    def get_legal_walls(self):
+        walls = []
+        for wall_type, mask in zip(("horizontal", "vertical"), self.legal_wall_masks()):
+            while mask:
+                bit = mask & -mask
+                walls.append(self.board.slot_wall(wall_type, bit.bit_length() - 1))
+                mask ^= bit
+
+        return walls
+
+    def can_place_wall(self, wall_type, x, y):
+        if not self.board.in_bounds(wall_type, x, y):
+            return False
+
+        horizontal, vertical = self.legal_wall_masks()
+        mask = horizontal if wall_type == "horizontal" else vertical
+        return bool((mask >> self.board.slot_index(wall_type, x, y)) & 1)
+
+    def add_wall(self, wall_type, x, y, owner):
+        if wall_type == "horizontal":
+            self.horizontal_walls.add((x, y))
+        else:
+            self.vertical_walls.add((x, y))
+        self.board.add_wall(wall_type, x, y)
+        self.clear_wall_cache()
+        self.hash ^= self.zobrist.wall(wall_type, x, y)
+        for distance_map in self.distance_maps.values():
+            distance_map.wall_added(wall_type, x, y)
+        self.wall_owners[(wall_type, x, y)] = owner
+
+    def remove_wall(self, wall_type, x, y):
+        if wall_type == "horizontal":
+            self.horizontal_walls.remove((x, y))
+        else:
+            self.vertical_walls.remove((x, y))
+        self.board.remove_wall(wall_type, x, y)
+        self.clear_wall_cache()
+        self.hash ^= self.zobrist.wall(wall_type, x, y)
+        for distance_map in self.distance_maps.values():
+            distance_map.wall_removed(wall_type, x, y)
+        del self.wall_owners[(wall_type, x, y)]
+
+    def apply_move(self, pawn, action, move):
+        side = self.side(pawn)
+
+        if action == "move":
+            previous = pawn.position
+            pawn.position = [move[0], move[1]]
+            self.clear_wall_cache()
+            self.hash ^= self.zobrist.pawn(side, previous)
+            self.hash ^= self.zobrist.pawn(side, pawn.position)
+            return previous
+
+        wall_type, x, y = move
+        self.add_wall(wall_type, x, y, self.owner_name(pawn))
+        self.hash ^= self.zobrist.walls_left[side][pawn.walls]
+        pawn.walls -= 1
+        self.hash ^= self.zobrist.walls_left[side][pawn.walls]
+
+    def undo_move(self, pawn, action, move, previous):
+        side = self.side(pawn)
+
+        if action == "move":
+            self.hash ^= self.zobrist.pawn(side, pawn.position)
+            self.hash ^= self.zobrist.pawn(side, previous)
+            pawn.position = previous
+            self.clear_wall_cache()
+            return
+
+        wall_type, x, y = move
+        self.remove_wall(wall_type, x, y)
+        self.hash ^= self.zobrist.walls_left[side][pawn.walls]
+        pawn.walls += 1
+        self.hash ^= self.zobrist.walls_left[side][pawn.walls]
+
+    def push_move(self, pawn, action, move):
+        self.redo_stack.clear()
+        return self.play(Move(pawn, action, move))
+
+    def play(self, entry):
+        entry.player_turn = self.player_turn
+        if entry.action is not None:
+            entry.previous = self.apply_move(entry.pawn, entry.action, entry.move)
+        self.move_stack.append(entry)
+        self.player_turn = not self.player_turn
+        return entry
+
+    def pop_move(self):
+        entry = self.move_stack.pop()
+        if entry.action is not None:
+            self.undo_move(entry.pawn, entry.action, entry.move, entry.previous)
+        self.player_turn = entry.player_turn
+        self.redo_stack.append(entry)
+        return entry
+
+    def redo_move(self):
+        return self.play(self.redo_stack.pop())
+
+    def is_blocked_by_wall(self, current_x, current_y, target_x, target_y):
+        return not self.board.can_step(
+            current_x, current_y, target_x - current_x, target_y - current_y
+        )
+
+    def get_valid_moves(self, pos):
+        other_pos = (
+            self.ai.position if pos == self.player.position else self.player.position
+        )
+
+        cells = self.board.cells
+        targets = self.board.pawn_moves(
+            self.board.cell_index(*pos), self.board.cell_index(*other_pos)
+        )
+        return [cells[target] for target in targets]
+
+    def get_valid_moves_for_pathfinding(self, pos):
+        index = self.board.cell_index(*pos)
+        return [cell for _, _, cell in self.board.open_neighbours(index)]
+
+    def has_path_to_goal(self, pos, goal_row):
+        return self.board.has_path(pos[0], pos[1], goal_row)
+
+    def shortest_path_length(self, pos, goal_row):
+        if goal_row in self.distance_maps:
+            return self.distance_maps[goal_row].get(pos[0], pos[1])
+        return self.board.distance(pos[0], pos[1], goal_row)
+
+    def distance_to_goal(self, pawn):
+        x, y = pawn.position
+        return self.distance_maps[self.goal_row(pawn)].get(x, y)
+
+    def shortest_path_steps(self, pawn, width):
+        distances = self.distance_maps[self.goal_row(pawn)]
+        remaining = self.distance_to_goal(pawn)
+        if remaining is None:
+            return []
+
+        cells = self.board.cells
+        steps = []
+        layer = [self.board.cell_index(*pawn.position)]
+        for _ in range(min(width, remaining)):
+            remaining -= 1
+            next_layer = {}
+            for index in layer:
+                for direction, neighbour, _ in self.board.open_neighbours(index):
+                    if distances.distances[neighbour] == remaining:
+                        steps.append((cells[index], DIRECTIONS[direction]))
+                        next_layer[neighbour] = True
+            layer = list(next_layer)
+
+        return steps
+
+    def distance_with_wall(self, pawn, wall_type, x, y):
+        distance_map = self.distance_maps[self.goal_row(pawn)]
+        self.board.add_wall(wall_type, x, y)
+        distance_map.wall_added(wall_type, x, y)
+        distance = self.distance_to_goal(pawn)
+        distance_map.wall_removed(wall_type, x, y)
+        self.board.remove_wall(wall_type, x, y)
+        return distance
+
+    def wall_distances(self, walls, pawns):
+        if self.batch_evaluator is None:
+            from batch import BatchEvaluator
+
+            self.batch_evaluator = BatchEvaluator(self.board)
+        return self.batch_evaluator.wall_distances(
+            walls, [(tuple(pawn.position), self.goal_row(pawn)) for pawn in pawns]
+        )
+
+    def find_path(self, pos, goal_row):
+        return self.board.find_path(pos[0], pos[1], goal_row)
+
+    def check_win(self):
+        if self.player.position[1] == 0:
+            self.game_over = True
+            self.winner = "Player"
+            return True
+
+        if self.ai.position[1] == self.GRID_SIZE - 1:
+            self.game_over = True
+            self.winner = "AI"
+            return True
+
+        return False
+
+    def reset_game(self):
+        self.horizontal_walls = set()
+        self.vertical_walls = set()
+        self.wall_owners = {}
+        self.move_stack = []
+        self.redo_stack = []
+        self.board.clear()
+        for distance_map in self.distance_maps.values():
+            distance_map.rebuild()
+        self.player.position, self.ai.position = start_positions(self.GRID_SIZE)
+        self.player.walls = self.wall_allowance
+        self.ai.walls = self.wall_allowance
+        self.hash = self.zobrist.hash_state(self)
+        self.clear_wall_cache()
+        self.player_turn = True
+        self.game_over = False
+        self.winner = None
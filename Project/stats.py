@@ -0,0 +1,93 @@
+import json
+import logging
+import time
+
+logger = logging.getLogger("quoridor.stats")
+
+COUNTERS = [
+    "nodes",
+    "cutoffs",
+    "tt_hits",
+    "wall_checks",
+    "bfs",
+    "evaluations",
+]
+
+
+class SearchStats:
+    def __init__(self, log=False):
+        self.log = log
+        self.games = []
+        self.turns = []
+        self.reset()
+
+    def reset(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.eval_time = 0.0
+        self.started = None
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def new_game(self):
+        if self.turns:
+            self.games.append(self.turns)
+        self.turns = []
+
+    def begin_turn(self):
+        self.reset()
+        self.started = time.perf_counter()
+
+    def end_turn(self, side, best_move, source, depth):
+        action, move, score = best_move
+        record = {
+            "turn": len(self.turns) + 1,
+            "side": side,
+            "source": source,
+            "action": action,
+            "move": move,
+            "score": score,
+            "depth": depth,
+            "time": time.perf_counter() - self.started,
+            "eval_time": self.eval_time,
+        }
+        record.update(self.counters)
+        self.turns.append(record)
+
+        if self.log:
+            logger.info(self.summary())
+        return record
+
+    def last_turn(self):
+        return self.turns[-1] if self.turns else None
+
+    def summary(self):
+        record = self.last_turn()
+        if record is None:
+            return "no turns recorded"
+
+        return (
+            f"{record['source']} d{record['depth']} "
+            f"{record['nodes']} nodes {record['cutoffs']} cuts "
+            f"{record['wall_checks']} walls {record['bfs']} bfs "
+            f"{record['time'] * 1000:.0f}ms (eval {record['eval_time'] * 1000:.0f}ms)"
+        )
+
+    def totals(self, turns):
+        totals = dict.fromkeys(COUNTERS, 0)
+        totals["time"] = 0.0
+        totals["eval_time"] = 0.0
+        for record in turns:
+            for name in totals:
+                totals[name] += record[name]
+        totals["turns"] = len(turns)
+        return totals
+
+    def dump(self, path):
+        games = self.games + [self.turns] if self.turns else self.games
+        trace = [
+            {"game": index + 1, "totals": self.totals(turns), "turns": turns}
+            for index, turns in enumerate(games)
+        ]
+        with open(path, "w") as handle:
+            json.dump({"games": trace}, handle, indent=2)
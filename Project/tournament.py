@@ -0,0 +1,287 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+from ai import AI
+from book import OpeningBook
+from mcts import MCTSAI
+from parallel import ParallelAI
+from records import GameRecord
+from rules import GameState, start_positions
+
+ENGINE_OPTIONS = {
+    "engine": ("engine", str),
+    "playouts": ("playouts", int),
+    "workers": ("workers", int),
+    "depth": ("search_depth", int),
+    "time": ("time_limit", float),
+    "nodes": ("node_limit", int),
+    "table": ("table_size", int),
+    "all_walls": ("consider_all_walls", lambda value: value.lower() in ("1", "true")),
+    "width": ("wall_width", int),
+    "defense": ("defense_width", int),
+    "book": ("opening_book", str),
+}
+
+
+def parse_engine(spec):
+    settings = {}
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        if key not in ENGINE_OPTIONS:
+            raise argparse.ArgumentTypeError(f"unknown engine option: {key}")
+        name, convert = ENGINE_OPTIONS[key]
+        settings[name] = convert(value)
+    return settings
+
+
+def create_engine(settings, position, seed, grid_size, walls):
+    options = dict(
+        table_size=settings.get("table_size", 1 << 16),
+        time_limit=settings.get("time_limit"),
+        node_limit=settings.get("node_limit"),
+    )
+    if settings.get("engine", "minimax") == "mcts":
+        engine = MCTSAI(
+            position,
+            None,
+            walls,
+            grid_size,
+            playouts=settings.get("playouts"),
+            seed=seed,
+            **options,
+        )
+    elif settings.get("engine") == "parallel":
+        engine = ParallelAI(
+            position,
+            None,
+            walls,
+            grid_size,
+            workers=settings.get("workers"),
+            **options,
+        )
+    else:
+        engine = AI(position, None, walls, grid_size, **options)
+    engine.search_depth = settings.get("search_depth", engine.search_depth)
+    engine.consider_all_walls = settings.get("consider_all_walls", False)
+    engine.wall_width = settings.get("wall_width", engine.wall_width)
+    engine.defense_width = settings.get("defense_width", engine.defense_width)
+    if settings.get("opening_book"):
+        engine.opening_book = OpeningBook(settings["opening_book"])
+    return engine
+
+
+def play_game(task):
+    index, first, second, seed, max_plies, grid_size, walls, opening = task
+    player, ai = start_positions(grid_size)
+    state = GameState(
+        create_engine(first, player, seed * 2, grid_size, walls),
+        create_engine(second, ai, seed * 2 + 1, grid_size, walls),
+        grid_size,
+    )
+    record = GameRecord(
+        grid_size, walls, {"mode": "self-play", "game": index, "seed": seed}
+    )
+    think_time = [0.0, 0.0]
+    moves = [0, 0]
+    plies = 0
+
+    opening_seed, opening_plies = opening
+    rng = random.Random(opening_seed)
+    while plies < opening_plies:
+        mover = state.player if state.player_turn else state.ai
+        move = rng.choice(state.get_valid_moves(mover.position))
+        state.push_move(mover, "move", move)
+        record.add("move", move)
+        plies += 1
+
+    while not state.check_win() and plies < max_plies:
+        mover = state.player if state.player_turn else state.ai
+        side = state.side(mover)
+
+        started = time.perf_counter()
+        action, move, _ = mover.choose_move(state, state.opponent(mover))
+        think_time[side] += time.perf_counter() - started
+        moves[side] += 1
+
+        state.push_move(mover, action, move)
+        record.add(action, move)
+        plies += 1
+
+    for engine in (state.player, state.ai):
+        if isinstance(engine, ParallelAI):
+            engine.close()
+
+    record.winner = state.winner
+    winner = None
+    if state.winner == "Player":
+        winner = 0
+    elif state.winner == "AI":
+        winner = 1
+
+    return {
+        "game": index,
+        "seed": seed,
+        "winner_side": winner,
+        "plies": plies,
+        "walls": len(state.horizontal_walls) + len(state.vertical_walls),
+        "think_time": think_time,
+        "moves": moves,
+        "record": record.encode(),
+    }
+
+
+def summarize(results, names):
+    summary = {name: {"wins": 0, "think_time": 0.0, "moves": 0} for name in names}
+    draws = 0
+
+    for result in results:
+        engines = result["engines"]
+        if result["winner_side"] is None:
+            draws += 1
+        else:
+            summary[engines[result["winner_side"]]]["wins"] += 1
+
+        for side, name in enumerate(engines):
+            summary[name]["think_time"] += result["think_time"][side]
+            summary[name]["moves"] += result["moves"][side]
+
+    games = len(results)
+    for stats in summary.values():
+        stats["win_rate"] = stats["wins"] / games if games else 0.0
+        stats["avg_think_time"] = (
+            stats["think_time"] / stats["moves"] if stats["moves"] else 0.0
+        )
+
+    lengths = [result["plies"] for result in results]
+    return {
+        "games": games,
+        "draws": draws,
+        "avg_plies": sum(lengths) / games if games else 0.0,
+        "min_plies": min(lengths, default=0),
+        "max_plies": max(lengths, default=0),
+        "engines": summary,
+    }
+
+
+def run_tournament(
+    engine_a,
+    engine_b,
+    games,
+    seed,
+    workers,
+    max_plies,
+    record_path=None,
+    grid_size=9,
+    walls=10,
+    opening_plies=4,
+):
+    tasks = []
+    for index in range(games):
+        if index % 2 == 0:
+            first, second = engine_a, engine_b
+        else:
+            first, second = engine_b, engine_a
+        opening = (seed + index - index % 2, opening_plies)
+        tasks.append(
+            (
+                index,
+                first,
+                second,
+                seed + index,
+                max_plies,
+                grid_size,
+                walls,
+                opening,
+            )
+        )
+
+    if "parallel" in (engine_a.get("engine"), engine_b.get("engine")):
+        results = [play_game(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = sorted(
+                pool.imap_unordered(play_game, tasks), key=lambda r: r["game"]
+            )
+
+    for result in results:
+        result["engines"] = ["a", "b"] if result["game"] % 2 == 0 else ["b", "a"]
+
+    if record_path is not None:
+        with open(record_path, "ab") as handle:
+            for result in results:
+                handle.write(result["record"])
+    for result in results:
+        del result["record"]
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Quoridor self-play")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--engine-a", type=parse_engine, default={})
+    parser.add_argument("--engine-b", type=parse_engine, default={})
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--output", default="tournament.json")
+    parser.add_argument("--record", help="append game records to this file")
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--walls", type=int, default=10)
+    parser.add_argument(
+        "--opening-plies",
+        type=int,
+        default=4,
+        help="random pawn moves played before the engines take over",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_tournament(
+        args.engine_a,
+        args.engine_b,
+        args.games,
+        args.seed,
+        args.workers,
+        args.max_plies,
+        args.record,
+        args.size,
+        args.walls,
+        args.opening_plies,
+    )
+    summary = summarize(results, ["a", "b"])
+    summary["wall_time"] = time.perf_counter() - started
+
+    with open(args.output, "w") as handle:
+        json.dump(
+            {
+                "engine_a": args.engine_a,
+                "engine_b": args.engine_b,
+                "size": args.size,
+                "walls": args.walls,
+                "opening_plies": args.opening_plies,
+                "summary": summary,
+                "results": results,
+            },
+            handle,
+            indent=2,
+        )
+
+    for name in ("a", "b"):
+        stats = summary["engines"][name]
+        print(
+            f"engine {name}: {stats['wins']} wins ({stats['win_rate']:.1%}), "
+            f"{stats['avg_think_time'] * 1000:.1f} ms/move"
+        )
+    print(
+        f"{summary['games']} games, {summary['draws']} draws, "
+        f"{summary['avg_plies']:.1f} plies avg, {summary['wall_time']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
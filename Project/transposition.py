@@ -0,0 +1,45 @@
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable:
+    def __init__(self, max_entries=1 << 18):
+        self.size = max(2, max_entries - max_entries % 2)
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+    def probe(self, key):
+        index = key % self.size & ~1
+        for slot in (index, index + 1):
+            entry = self.entries[slot]
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def store(self, key, depth, flag, score, action, move):
+        index = key % self.size & ~1
+        first = self.entries[index]
+        second = self.entries[index + 1]
+        entry = (key, depth, flag, score, action, move, self.generation)
+
+        if first is not None and first[0] == key:
+            if depth >= first[1] or first[6] != self.generation:
+                self.entries[index] = entry
+            return
+        if second is not None and second[0] == key:
+            self.entries[index + 1] = entry
+            return
+
+        if first is None or first[6] != self.generation or depth >= first[1]:
+            if first is not None:
+                self.entries[index + 1] = first
+            self.entries[index] = entry
+        else:
+            self.entries[index + 1] = entry
@@ -0,0 +1,54 @@
+import threading
+
+from ai import SearchCancelled
+
+
+class AIWorker:
+    def __init__(self, ai, on_done=None):
+        self.ai = ai
+        self.on_done = on_done
+        self.thread = None
+        self.result = None
+        self.done = False
+
+    def start(self, game):
+        self.result = None
+        self.done = False
+        self.ai.cancelled = False
+        self.thread = threading.Thread(
+            target=self.search, args=(game.copy(),), daemon=True
+        )
+        self.thread.start()
+
+    def search(self, snapshot):
+        try:
+            self.result = self.ai.choose_move(snapshot, snapshot.player)
+        except SearchCancelled:
+            self.result = None
+
+        self.done = True
+        if self.on_done is not None:
+            self.on_done()
+
+    def is_idle(self):
+        return self.thread is None
+
+    def is_thinking(self):
+        return self.thread is not None and not self.done
+
+    def poll(self):
+        if self.thread is None or not self.done:
+            return None
+
+        self.thread.join()
+        self.thread = None
+        return self.result
+
+    def cancel(self):
+        if self.thread is not None:
+            self.ai.cancel()
+            self.thread.join()
+            self.thread = None
+            self.ai.cancelled = False
+        self.result = None
+        self.done = False
@@ -0,0 +1,39 @@
+import random
+
+
+class Zobrist:
+    def __init__(self, grid_size, max_walls, seed=20240917):
+        rng = random.Random(seed)
+        cells = grid_size * grid_size
+        slots = (grid_size - 1) * (grid_size - 1)
+
+        self.grid_size = grid_size
+        self.slot_size = grid_size - 1
+        self.pawns = [[rng.getrandbits(64) for _ in range(cells)] for _ in range(2)]
+        self.horizontal = [rng.getrandbits(64) for _ in range(slots)]
+        self.vertical = [rng.getrandbits(64) for _ in range(slots)]
+        self.turn = rng.getrandbits(64)
+        self.walls_left = [[], []]
+        for _ in range(max_walls + 1):
+            self.walls_left[0].append(rng.getrandbits(64))
+            self.walls_left[1].append(rng.getrandbits(64))
+
+    def pawn(self, side, position):
+        return self.pawns[side][position[1] * self.grid_size + position[0]]
+
+    def wall(self, wall_type, x, y):
+        if wall_type == "horizontal":
+            return self.horizontal[(y - 1) * self.slot_size + x]
+        return self.vertical[y * self.slot_size + x - 1]
+
+    def hash_state(self, game):
+        value = self.pawn(0, game.player.position) ^ self.pawn(1, game.ai.position)
+        value ^= self.walls_left[0][game.player.walls]
+        value ^= self.walls_left[1][game.ai.walls]
+
+        for x, y in game.horizontal_walls:
+            value ^= self.wall("horizontal", x, y)
+        for x, y in game.vertical_walls:
+            value ^= self.wall("vertical", x, y)
+
+        return value